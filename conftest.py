@@ -4,4 +4,4 @@ pytest local plugin configuration
 '''
 
 
-pytest_plugins = ("pytest_custom_output,pytest_mark_incremental")
+pytest_plugins = ("pytest_custom_output,pytest_mark_incremental,pytest_mark_benchmark,pytest_mkdir_runner,pytest_mkdir_names,pytest_mkdir_soak,pytest_mkdir_baseline,pytest_mkdir_shard,pytest_mkdir_profile,pytest_mkdir_modes,pytest_mkdir_workdir,pytest_mkdir_watch")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+'''
+Asyncio bulk invocation engine for mkdir_tester test suite
+
+Runs many independent command invocations at the same time, bounded by
+configurable concurrency limit and with per-invocation timeout:
+
+    results = mkdir_async.run_all({
+        'help': mkdir_async.Invocation(('--help',)),
+        'version': mkdir_async.Invocation(('--version',)),
+    })
+    mkdir_runner.check_exit_code(results['help'])
+
+Results are mkdir_runner.Result objects keyed the same way as invocations,
+test cases then assert on them the same way as on directly run commands.
+'''
+
+import asyncio
+import os
+import time
+from typing import Dict, Hashable, NamedTuple, Optional, Sequence
+
+import mkdir_runner
+
+
+DEFAULT_TIMEOUT = 30.0
+
+# Defaults used when run_all() is called without explicit limits,
+# configured by pytest_mkdir_runner plugin from CLI options
+concurrency_limit: int = os.cpu_count() or 1
+timeout_limit: float = DEFAULT_TIMEOUT
+
+
+class Invocation(NamedTuple):
+    args: Sequence
+    cwd: Optional[str] = None
+    env: Optional[Dict] = None
+    umask: Optional[int] = None
+
+
+def configure(concurrency: Optional[int] = None, timeout: Optional[float] = None):
+    '''
+    Change default concurrency limit and per-invocation timeout
+    '''
+    global concurrency_limit, timeout_limit
+
+    if concurrency is not None:
+        concurrency_limit = max(concurrency, 1)
+    if timeout is not None:
+        timeout_limit = timeout
+
+
+async def _run_one(semaphore: asyncio.Semaphore, argv, invocation: Invocation,
+                   timeout: float) -> mkdir_runner.Result:
+    # subprocess uses -1 for keeping umask inherited from this process
+    umask = -1 if invocation.umask is None else invocation.umask
+
+    async with semaphore:
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *argv, cwd=invocation.cwd, env=invocation.env, umask=umask,
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE)
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                # Exited just after the time limit, already waited for
+                pass
+            stdout, stderr = await process.communicate()
+            return mkdir_runner.Result(argv, process.returncode, stdout, stderr,
+                                       time.perf_counter() - start, timed_out=True)
+
+        return mkdir_runner.Result(argv, process.returncode, stdout, stderr,
+                                   time.perf_counter() - start)
+
+
+async def _run_all(command: mkdir_runner.Command, invocations: Dict[Hashable, Invocation],
+                   concurrency: int, timeout: float):
+    semaphore = asyncio.Semaphore(concurrency)
+    keys = list(invocations)
+    results = await asyncio.gather(*(
+        _run_one(semaphore, command._argv(*invocations[key].args), invocations[key], timeout)
+        for key in keys))
+    for result in results:
+        mkdir_runner.notify(result)
+    return dict(zip(keys, results))
+
+
+def run_all(invocations: Dict[Hashable, Invocation], command: mkdir_runner.Command = None,
+            concurrency: Optional[int] = None,
+            timeout: Optional[float] = None) -> Dict[Hashable, mkdir_runner.Result]:
+    '''
+    Run all invocations of command (mkdir by default) concurrently
+
+    invocations: dict of key -> Invocation
+    concurrency: max number of running processes, module default if not given
+    timeout: per-invocation time limit in seconds, module default if not given
+
+    Returns dict of key -> mkdir_runner.Result
+    '''
+    return asyncio.run(_run_all(
+        command if command is not None else mkdir_runner.mkdir, invocations,
+        concurrency if concurrency is not None else concurrency_limit,
+        timeout if timeout is not None else timeout_limit))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+'''
+Batched mkdir execution helpers
+
+Passes a whole set of operands to a single mkdir process and attributes
+success or failure back to every single operand using mkdir's per-operand
+STDERR diagnostics and the resulting directory listing.
+'''
+
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+import mkdir_runner
+
+
+# Diagnostic printed by mkdir for every operand it failed to create, e.g.
+#   mkdir: cannot create directory 'name': File exists
+_DIAGNOSTIC_RE = re.compile(r"^[^:]*: cannot create directory (.+): ([^:]+)$")
+
+# C escapes used by mkdir when quoting operands in 'C' locale
+_C_ESCAPES = {
+    ord('\a'): '\\a',
+    ord('\b'): '\\b',
+    ord('\f'): '\\f',
+    ord('\n'): '\\n',
+    ord('\r'): '\\r',
+    ord('\t'): '\\t',
+    ord('\v'): '\\v',
+    ord('\\'): '\\\\',
+    ord("'"): "\\'",
+}
+
+# Environment forcing predictable (ASCII, C-escaped) quoting of operands
+_BATCH_ENV = dict(os.environ, LC_ALL='C')
+
+
+class OperandResult(NamedTuple):
+    name: Union[str, bytes]
+    created: bool
+    message: str
+
+
+class BatchResult:
+    '''
+    Outcome of batched mkdir execution
+
+    exit_codes: exit codes of all mkdir processes run for the batch
+    results: per-operand results keyed by operand name, in operand order
+    unattributed: STDERR lines which could not be matched to any operand
+    '''
+
+    def __init__(self):
+        self.exit_codes: List[int] = []
+        self.results: Dict[Union[str, bytes], OperandResult] = {}
+        self.unattributed: List[str] = []
+
+    @property
+    def failed(self) -> List[OperandResult]:
+        return [result for result in self.results.values() if not result.created]
+
+
+def quote_c_locale(name) -> str:
+    '''
+    Quote operand name (str or bytes) the way mkdir does in its diagnostics
+    in 'C' locale, non-ASCII bytes are printed as octal escapes
+    '''
+    quoted = []
+    for byte in os.fsencode(name):
+        if byte in _C_ESCAPES:
+            quoted.append(_C_ESCAPES[byte])
+        elif byte < 0x20 or byte >= 0x7F:
+            quoted.append('\\{:03o}'.format(byte))
+        else:
+            quoted.append(chr(byte))
+    return "'{}'".format(''.join(quoted))
+
+
+def parse_diagnostics(stderr: str, names: Iterable):
+    '''
+    Map mkdir STDERR diagnostics to operand names
+
+    Returns tuple (dict of operand name -> failure reason, list of unmatched lines)
+    '''
+    quoted_names = {quote_c_locale(name): name for name in names}
+    failures = {}
+    unattributed = []
+
+    for line in stderr.splitlines():
+        match = _DIAGNOSTIC_RE.match(line)
+        name = quoted_names.get(match.group(1)) if match else None
+        if name is None:
+            unattributed.append(line)
+        else:
+            failures.setdefault(name, match.group(2))
+
+    return failures, unattributed
+
+
+def run_batch(directory, names: List, options: Iterable[str] = (),
+              batch_size: Optional[int] = None) -> BatchResult:
+    '''
+    Create directories given by names inside directory
+
+    directory: parent directory, mkdir is run with it as working directory
+    names: operand names (str or bytes) relative to directory
+    options: extra mkdir CLI options placed before the operands
+    batch_size: max number of operands passed to a single mkdir process,
+        None passes as many operands as ARG_MAX allows, 1 runs one process
+        per operand
+    '''
+    directory = str(directory)
+    fixed_args = [mkdir_runner.mkdir._path, *options, '--']
+    result = BatchResult()
+    failures = {}
+
+    for chunk in mkdir_runner.split_args(names, fixed_args, _BATCH_ENV, batch_size):
+        process = mkdir_runner.mkdir(*options, '--', *chunk, _cwd=directory,
+                                     _env=_BATCH_ENV, _ok_code=range(256))
+        result.exit_codes.append(process.exit_code)
+
+        chunk_failures, unattributed = parse_diagnostics(
+            process.stderr.decode('utf-8', errors='replace'), chunk)
+        failures.update(chunk_failures)
+        result.unattributed.extend(unattributed)
+
+    # Single directory listing pass instead of one stat call per operand
+    with os.scandir(os.fsencode(directory)) as entries:
+        listing = {entry.name for entry in entries if entry.is_dir(follow_symlinks=False)}
+
+    for name in names:
+        if name in failures:
+            result.results[name] = OperandResult(name, False, failures[name])
+        elif os.fsencode(name) not in listing:
+            result.results[name] = OperandResult(name, False, "directory not found after mkdir")
+        else:
+            result.results[name] = OperandResult(name, True, '')
+
+    return result
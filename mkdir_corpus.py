@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+'''
+Streaming corpus of candidate directory names
+
+Reads a corpus file of arbitrary size through read-only memory map and
+lazily extracts candidate byte-string names from it, e.g. from shipped
+docs/UTF-8-test.txt containing boundary, overlong and malformed UTF-8
+sequences. Only one batch of names is held in memory at a time.
+
+Every line yields its double-quoted segments as whole candidates (including
+spaces, a quote left open continues to the end of line) and all remaining
+whitespace-separated tokens as further candidates.
+
+    for batch in mkdir_corpus.iter_batches(mkdir_corpus.DEFAULT_CORPUS, 1000):
+        for name in batch:
+            print(mkdir_corpus.byte_class(name), name)
+'''
+
+import mmap
+import os
+from typing import Iterator, List
+
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docs', 'UTF-8-test.txt')
+
+NAME_MAX = 255  # max file name length in bytes
+
+# Byte classes of candidate names, valid UTF-8 classes are named after the
+# longest encoded sequence contained, invalid ones after the first defect
+BYTE_CLASSES = (
+    'ascii',
+    'utf8-2byte',
+    'utf8-3byte',
+    'utf8-4byte',
+    'invalid-continuation',
+    'truncated-sequence',
+    'overlong',
+    'surrogate',
+    'out-of-range',
+    'invalid-lead',
+)
+
+_RESERVED_NAMES = {b'.', b'..'}
+
+# Table frame characters right-padding lines of the shipped UTF-8 test file
+_LINE_PADDING = b' \t\r|'
+
+
+def iter_lines(path) -> Iterator[bytes]:
+    '''
+    Lazily iterate over lines of memory mapped file
+    '''
+    with open(path, 'rb') as corpus_file:
+        if os.fstat(corpus_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            size = len(data)
+            while start < size:
+                end = data.find(b'\n', start)
+                if end == -1:
+                    end = size
+                yield data[start:end]
+                start = end + 1
+
+
+def iter_candidates(path) -> Iterator[bytes]:
+    '''
+    Lazily extract candidate names from corpus file
+
+    NUL and '/' bytes can't be part of a name, candidates are split on them.
+    Empty and reserved '.' and '..' candidates are left out, candidates
+    longer than NAME_MAX bytes are truncated.
+    '''
+    for line in iter_lines(path):
+        parts = line.rstrip(_LINE_PADDING).split(b'"')
+        for index, part in enumerate(parts):
+            # Odd parts are inside quotes
+            segments = [part] if index % 2 else part.split()
+            for segment in segments:
+                for name in segment.replace(b'\x00', b'/').split(b'/'):
+                    name = name[:NAME_MAX]
+                    if name and name not in _RESERVED_NAMES:
+                        yield name
+
+
+def iter_batches(path, batch_size: int) -> Iterator[List[bytes]]:
+    '''
+    Lazily group candidate names into batches of unique names
+    '''
+    batch = []
+    seen = set()
+
+    for name in iter_candidates(path):
+        if name in seen:
+            continue
+        seen.add(name)
+        batch.append(name)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+            seen = set()
+
+    if batch:
+        yield batch
+
+
+def byte_class(name: bytes) -> str:
+    '''
+    Classify name into one of BYTE_CLASSES
+    '''
+    if max(name) < 0x80:
+        return 'ascii'
+
+    longest = 1
+    index = 0
+    while index < len(name):
+        lead = name[index]
+        if lead < 0x80:
+            index += 1
+            continue
+        if lead <= 0xBF:
+            return 'invalid-continuation'
+        if lead in (0xC0, 0xC1):
+            return 'overlong'
+        if lead >= 0xF8:
+            return 'invalid-lead'
+        if lead >= 0xF5:
+            return 'out-of-range'
+
+        length = 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        continuation = name[index + 1:index + length]
+        if len(continuation) < length - 1 or any(byte & 0xC0 != 0x80 for byte in continuation):
+            return 'truncated-sequence'
+
+        second = continuation[0]
+        if (lead == 0xE0 and second < 0xA0) or (lead == 0xF0 and second < 0x90):
+            return 'overlong'
+        if lead == 0xED and second >= 0xA0:
+            return 'surrogate'
+        if lead == 0xF4 and second >= 0x90:
+            return 'out-of-range'
+
+        longest = max(longest, length)
+        index += length
+
+    return 'utf8-{}byte'.format(longest)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+'''
+mkdir_tester fork server
+
+Long-lived helper process executing commands on behalf of the test suite.
+Spawning a child from this small interpreter is cheaper than forking large
+pytest process for every single mkdir invocation.
+
+Started by mkdir_runner 'forkserver' backend, not meant to be run directly.
+Requests and responses are length-prefixed pickled dicts on STDIN/STDOUT:
+      - request: {"argv": [...], "cwd": str, "env": dict, "umask": int or None}
+      - response: {"exit_code": int, "stdout": bytes, "stderr": bytes, "elapsed": float,
+                   "rusage": (user, system, maxrss, nvcsw, nivcsw, inblock, oublock)}
+      - response if the command could not be executed (no such file, working
+        directory not accessible...): {"error": (errno, strerror, filename)}
+'''
+
+import os
+import pickle
+import select
+import struct
+import sys
+import time
+
+
+_HEADER = struct.Struct('!I')
+
+# Longest path passed to single chdir() call, safely below PATH_MAX
+_CHDIR_STEP = 4000
+
+
+def read_frame(fd: int):
+    '''
+    Read single length-prefixed frame from fd, returns None on EOF
+    '''
+    header = _read_exactly(fd, _HEADER.size)
+    if header is None:
+        return None
+    payload = _read_exactly(fd, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+    return pickle.loads(payload)
+
+
+def write_frame(fd: int, obj):
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    data = memoryview(_HEADER.pack(len(payload)) + payload)
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def _read_exactly(fd: int, size: int):
+    chunks = []
+    while size:
+        data = os.read(fd, size)
+        if not data:
+            return None
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+
+def _chdir(path: str):
+    # Paths longer than PATH_MAX are entered in several relative steps
+    if path.startswith('/'):
+        os.chdir('/')
+    step = ''
+    for component in path.split('/'):
+        if step and len(step) + len(component) >= _CHDIR_STEP:
+            os.chdir(step)
+            step = ''
+        if component:
+            step = step + '/' + component if step else component
+    if step:
+        os.chdir(step)
+
+
+def _exec_child(request, out_w: int, err_w: int, status_w: int):
+    # Runs in forked child, never returns. Status pipe is closed on successful
+    # exec, otherwise it carries the error
+    try:
+        try:
+            _chdir(request['cwd'])
+        except OSError as exc:
+            # Report whole path rather than the failed step
+            raise OSError(exc.errno, exc.strerror, request['cwd']) from None
+        if request['umask'] is not None:
+            os.umask(request['umask'])
+        null_fd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null_fd, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        os.execve(request['argv'][0], request['argv'], request['env'])
+    except OSError as exc:
+        write_frame(status_w, (exc.errno, exc.strerror, exc.filename))
+    except BaseException as exc:
+        write_frame(status_w, (None, "failed to execute {!r}: {}".format(
+            request['argv'][0], exc), None))
+    finally:
+        os._exit(127)
+
+
+def run(request):
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    # Not inheritable, closed by successful exec
+    status_r, status_w = os.pipe()
+
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        _exec_child(request, out_w, err_w, status_w)
+    os.close(out_w)
+    os.close(err_w)
+    os.close(status_w)
+
+    error = read_frame(status_r)
+    os.close(status_r)
+    if error is not None:
+        for fd in (out_r, err_r):
+            os.close(fd)
+        os.waitpid(pid, 0)
+        return {'error': error}
+
+    chunks = {out_r: [], err_r: []}
+    open_fds = [out_r, err_r]
+    while open_fds:
+        readable, _, _ = select.select(open_fds, [], [])
+        for fd in readable:
+            data = os.read(fd, 65536)
+            if data:
+                chunks[fd].append(data)
+            else:
+                open_fds.remove(fd)
+                os.close(fd)
+
+    _, status, rusage = os.wait4(pid, 0)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'exit_code': os.waitstatus_to_exitcode(status),
+        'stdout': b''.join(chunks[out_r]),
+        'stderr': b''.join(chunks[err_r]),
+        'elapsed': elapsed,
+        'rusage': (rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss, rusage.ru_nvcsw,
+                   rusage.ru_nivcsw, rusage.ru_inblock, rusage.ru_oublock),
+    }
+
+
+def main():
+    in_fd = sys.stdin.fileno()
+    out_fd = sys.stdout.fileno()
+
+    while True:
+        request = read_frame(in_fd)
+        if request is None:
+            break
+        write_frame(out_fd, run(request))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+'''
+Constant memory latency histogram
+
+Latencies are counted in fixed logarithmic buckets, BUCKETS_PER_OCTAVE
+per power of two from 1 us up to over an hour, so memory use does not
+grow with number of recorded values. Percentiles are reported as upper
+bound of the bucket they fall into (within 9 % of the exact value), max
+is exact.
+
+    histogram = mkdir_histogram.Histogram()
+    histogram.record(result.elapsed)
+    print(histogram.percentile(0.99), histogram.max)
+'''
+
+import math
+from typing import Dict, List
+
+
+BUCKETS_PER_OCTAVE = 8
+MIN_VALUE = 1e-6  # lower bound of the first bucket in seconds
+OCTAVES = 32
+BUCKET_COUNT = BUCKETS_PER_OCTAVE * OCTAVES
+
+
+def bucket_index(value: float) -> int:
+    '''
+    Bucket counting value, values out of range fall into the first or last one
+    '''
+    if value <= MIN_VALUE:
+        return 0
+    return min(int(math.log2(value / MIN_VALUE) * BUCKETS_PER_OCTAVE), BUCKET_COUNT - 1)
+
+
+def bucket_upper_bound(index: int) -> float:
+    return MIN_VALUE * 2 ** ((index + 1) / BUCKETS_PER_OCTAVE)
+
+
+class Histogram:
+    '''
+    Fixed-bucket histogram of latencies in seconds
+    '''
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram'):
+        '''
+        Add all values recorded by other histogram
+        '''
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> float:
+        '''
+        Nearest-rank percentile, e.g. 0.99 for p99, 0.0 if nothing was recorded
+        '''
+        if not self.count:
+            return 0.0
+
+        rank = max(math.ceil(fraction * self.count), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bucket_upper_bound(index), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        '''
+        Compact serializable form, only non-empty buckets are included
+        '''
+        return {
+            'buckets': {index: count for index, count in enumerate(self.counts) if count},
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Histogram':
+        histogram = cls()
+        for index, count in data['buckets'].items():
+            # JSON based serialization turns integer keys into strings
+            histogram.counts[int(index)] = count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.max = data['max']
+        return histogram
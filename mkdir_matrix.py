@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+'''
+Multi-implementation comparison matrix
+
+Runs the whole test suite once per mkdir implementation, all of them in
+parallel as separate pytest processes, and combines their JSONL records
+into side-by-side conformance and timing matrix. Files written by the
+runs (incremental store, baseline database, benchmark and profile output)
+are kept separate per binary:
+
+    exit_code = mkdir_matrix.run_matrix(['/bin/mkdir', '/bin/busybox-mkdir'], pytest_args)
+'''
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Sequence
+
+from pytest_mark_benchmark import BenchTable
+
+
+# Short cell labels of check outcomes
+_OUTCOME_LABELS = {
+    'passed': 'PASS',
+    'failed': 'FAIL',
+    'error': 'ERROR',
+    'skipped': 'SKIP',
+    'xfailed': 'XFAIL',
+    'xpassed': 'UPASS',
+}
+
+# Options naming files written by the run, every parallel run gets its own
+# file with 1-based binary index inserted before extension, e.g.
+# baseline.2.sqlite, so runs don't share failures or overwrite results
+PER_RUN_PATH_OPTIONS = (
+    '--incremental-store',
+    '--baseline-db',
+    '--benchmark-output',
+    '--profile-output',
+)
+
+
+def strip_option(args: Sequence[str], option: str) -> List[str]:
+    '''
+    Command line arguments without all occurrences of given option and its value
+    '''
+    stripped = []
+    skip_value = False
+    for arg in args:
+        if skip_value:
+            skip_value = False
+        elif arg == option:
+            skip_value = True
+        elif not arg.startswith(option + '='):
+            stripped.append(arg)
+    return stripped
+
+
+def option_value(args: Sequence[str], option: str) -> Optional[str]:
+    '''
+    Value of the last occurrence of option in command line arguments, None if not given
+    '''
+    value = None
+    for position, arg in enumerate(args):
+        if arg == option and position + 1 < len(args):
+            value = args[position + 1]
+        elif arg.startswith(option + '='):
+            value = arg[len(option) + 1:]
+    return value
+
+
+def run_path(path: str, index: int) -> str:
+    '''
+    Path of file written by index-th run, index inserted before extension
+    '''
+    root, ext = os.path.splitext(path)
+    return '{}.{}{}'.format(root, index, ext)
+
+
+def read_records(path) -> List[Dict]:
+    records = []
+    try:
+        with open(path, encoding='utf-8') as records_file:
+            for line in records_file:
+                if line.strip():
+                    records.append(json.loads(line))
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def build_table(binaries: Sequence[str], records: Sequence[Sequence[Dict]]) -> BenchTable:
+    '''
+    Matrix of check outcomes and durations, one column per binary
+    '''
+    table = BenchTable("Comparison of mkdir implementations (outcome, duration [s])",
+                       ["check"] + ["[{}] {}".format(index, binary)
+                                    for index, binary in enumerate(binaries, 1)])
+
+    # Checks in order of first appearance, missing in some runs shown as "-"
+    checks = {}
+    cells = [{} for _ in binaries]
+    for column, binary_records in enumerate(records):
+        for record in binary_records:
+            checks.setdefault(record['nodeid'], record['description'])
+            cells[column][record['nodeid']] = "{} {:.3f}".format(
+                _OUTCOME_LABELS.get(record['outcome'], record['outcome'].upper()),
+                record['duration'])
+
+    for nodeid, description in checks.items():
+        table.add_row(description, *(column.get(nodeid, "-") for column in cells))
+
+    table.add_row("passed checks", *("{}/{}".format(
+        sum(record['outcome'] == 'passed' for record in binary_records), len(checks))
+        for binary_records in records))
+    table.add_row("total time [s]", *("{:.3f}".format(
+        sum(record['duration'] for record in binary_records)) for binary_records in records))
+    return table
+
+
+def run_matrix(binaries: Sequence[str], pytest_args: Sequence[str], out=None) -> int:
+    '''
+    Run pytest with pytest_args once per binary in parallel, print matrix
+
+    Returns 0 if all runs passed, otherwise exit code of first failed run
+    '''
+    out = out if out is not None else sys.stdout
+    args = strip_option(strip_option(pytest_args, '--mkdir-binary'), '--report-jsonl')
+    paths = {}
+    for option in PER_RUN_PATH_OPTIONS:
+        paths[option] = option_value(args, option)
+        args = strip_option(args, option)
+
+    with tempfile.TemporaryDirectory(prefix='mkdir_matrix') as work_dir:
+        runs = []
+        for index, binary in enumerate(binaries):
+            jsonl_path = os.path.join(work_dir, '{}.jsonl'.format(index))
+            output = open(os.path.join(work_dir, '{}.out'.format(index)), 'w+b')
+            run_args = ['{}={}'.format(option, run_path(path, index + 1))
+                        for option, path in paths.items() if path is not None]
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'pytest', *args, *run_args,
+                 '--mkdir-binary={}'.format(binary), '--report-jsonl={}'.format(jsonl_path)],
+                stdin=subprocess.DEVNULL, stdout=output, stderr=subprocess.STDOUT)
+            runs.append((binary, process, output, jsonl_path))
+
+        exit_codes = []
+        records = []
+        summaries = []
+        for binary, process, output, jsonl_path in runs:
+            exit_codes.append(process.wait())
+            records.append(read_records(jsonl_path))
+            output.seek(0)
+            lines = output.read().decode(errors='replace').strip().splitlines()
+            output.close()
+            summaries.append(lines[-1] if lines else "(no output)")
+
+    for line in build_table(binaries, records).lines():
+        out.write(line + "\n")
+    out.write("\n")
+    for index, (binary, summary) in enumerate(zip(binaries, summaries), 1):
+        out.write("[{}] {}: {}\n".format(index, binary, summary))
+    out.flush()
+
+    return next((code for code in exit_codes if code), 0)
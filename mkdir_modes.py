@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+'''
+In-process evaluation of mkdir '-m/--mode' arguments
+
+Computes permission bits of directory created by 'mkdir -m MODE' under
+given umask, following chmod(1) and mkdir(1) semantics of GNU coreutils:
+mode is applied to 'a=rwx' (umask limits only symbolic changes without
+explicit 'ugoa' part) and the resulting bits are not limited by umask.
+Directories with setuid, setgid or sticky bit are created without group and
+other write permission and fixed by chmod only if changed bits differ,
+setgid not mentioned by the mode is inherited from the parent directory:
+
+    mkdir_modes.expected_mode('u+rwx,g-w', 0o022)   # 0o757
+    mkdir_modes.expected_mode('+w', 0o022)          # 0o777
+    mkdir_modes.expected_mode('-w', 0o022)          # 0o577
+    mkdir_modes.expected_mode('+t', 0o000)          # 0o1755
+'''
+
+import stat
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+
+CHMOD_MODE_BITS = 0o7777
+_SPECIAL_ID_BITS = stat.S_ISUID | stat.S_ISGID
+
+# Mode arguments beyond 4-digit octal numbers
+SYMBOLIC_MODES = (
+    'u+rwx,g-w',
+    'a=rwx',
+    'u=rwx,go=',
+    'go-rwx',
+    'ug=rwx,o=rx',
+    'u=rwx,g=u-w,o=g',
+    'a=rX',
+    'a-x',
+    'o=',
+    '=',
+    '=rwx',
+    '+x',
+    '-w',
+    '+t',
+    'u+s',
+    'g+s',
+    'a+st',
+    'u+s,g+s,+t',
+    'g-s',
+    '0',
+    '755',
+    '02755',
+)
+
+UMASKS = (0o000, 0o002, 0o022, 0o027, 0o077, 0o777)
+
+_WHO_BITS = {
+    'u': stat.S_ISUID | stat.S_IRWXU,
+    'g': stat.S_ISGID | stat.S_IRWXG,
+    'o': stat.S_ISVTX | stat.S_IRWXO,
+    'a': CHMOD_MODE_BITS,
+}
+
+_PERM_BITS = {
+    'r': stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH,
+    'w': stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH,
+    'x': stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH,
+    's': _SPECIAL_ID_BITS,
+    't': stat.S_ISVTX,
+}
+
+# Permission bits copied by 'g=u' style changes
+_COPY_BITS = {'u': stat.S_IRWXU, 'g': stat.S_IRWXG, 'o': stat.S_IRWXO}
+
+
+class ModeChange(NamedTuple):
+    op: str             # '=', '+' or '-'
+    affected: int       # bits selected by 'ugoa' part, 0 if not given
+    value: int
+    mentioned: int
+    copy: bool = False  # value is a copy of existing bits ('g=u')
+    x_if_any_x: bool = False
+
+
+def compile_mode(mode: str) -> List[ModeChange]:
+    '''
+    List of changes described by octal or symbolic mode, ValueError if invalid
+    '''
+    if mode and all(char in '01234567' for char in mode):
+        value = int(mode, 8)
+        if value > CHMOD_MODE_BITS:
+            raise ValueError("invalid mode '{}'".format(mode))
+        # Up to 4 digits keep setuid/setgid of directories unless set
+        mentioned = (CHMOD_MODE_BITS if len(mode) >= 5 else
+                     (value & _SPECIAL_ID_BITS) | stat.S_ISVTX | stat.S_IRWXU
+                     | stat.S_IRWXG | stat.S_IRWXO)
+        return [ModeChange('=', CHMOD_MODE_BITS, value, mentioned)]
+
+    changes = []
+    for clause in mode.split(','):
+        position = 0
+        affected = 0
+        while position < len(clause) and clause[position] in _WHO_BITS:
+            affected |= _WHO_BITS[clause[position]]
+            position += 1
+
+        if position == len(clause):
+            raise ValueError("invalid mode '{}'".format(mode))
+
+        while position < len(clause):
+            op = clause[position]
+            if op not in '=+-':
+                raise ValueError("invalid mode '{}'".format(mode))
+            position += 1
+
+            value = 0
+            copy = x_if_any_x = False
+            if position < len(clause) and clause[position] in _COPY_BITS:
+                value = _COPY_BITS[clause[position]]
+                copy = True
+                position += 1
+            else:
+                while position < len(clause) and (clause[position] in _PERM_BITS
+                                                   or clause[position] == 'X'):
+                    if clause[position] == 'X':
+                        x_if_any_x = True
+                    else:
+                        value |= _PERM_BITS[clause[position]]
+                    position += 1
+
+            changes.append(ModeChange(op, affected, value,
+                                      affected & value if affected else value,
+                                      copy, x_if_any_x))
+    return changes
+
+
+def adjust_mode(changes: Iterable[ModeChange], umask: int, mode: int = 0o777,
+                directory: bool = True) -> Tuple[int, int]:
+    '''
+    Mode after applying changes to mode and bits changed on the way
+    '''
+    changed = 0
+    for change in changes:
+        omit = (_SPECIAL_ID_BITS if directory else 0) & ~change.mentioned
+        value = change.value
+
+        if change.copy:
+            value &= mode
+            value |= ((0o444 if value & 0o444 else 0)
+                      | (0o222 if value & 0o222 else 0)
+                      | (0o111 if value & 0o111 else 0))
+        elif change.x_if_any_x and (mode & 0o111 or directory):
+            value |= 0o111
+
+        value &= (change.affected if change.affected else ~umask) & ~omit
+
+        if change.op == '=':
+            preserved = (~change.affected if change.affected else 0) | omit
+            changed |= ~preserved & CHMOD_MODE_BITS
+            mode = (mode & preserved) | value
+        elif change.op == '+':
+            changed |= value
+            mode |= value
+        else:
+            changed |= value
+            mode &= ~value
+
+    return mode & CHMOD_MODE_BITS, changed
+
+
+def expected_mode(mode: str, umask: int, parent_setgid: bool = False) -> int:
+    '''
+    Permission bits of directory created by 'mkdir -m mode' under umask
+    '''
+    bits, changed = adjust_mode(compile_mode(mode), umask)
+
+    # Umask is lowered not to clear any of resulting bits, directory with
+    # special bits is created without group/other write permission first
+    # and changed by chmod only if some of changed bits don't match
+    keep_special = not (changed & _SPECIAL_ID_BITS or bits & stat.S_ISVTX)
+    mkdir_mode = bits if keep_special else bits & ~(stat.S_IWGRP | stat.S_IWOTH)
+
+    # mkdir(2) ignores setuid/setgid bits, setgid is inherited from parent
+    created = mkdir_mode & (stat.S_ISVTX | 0o777)
+    if parent_setgid:
+        created |= stat.S_ISGID
+
+    if not keep_special and (created ^ bits) & changed:
+        return bits | (created & ~changed)
+    return created
+
+
+def octal_modes() -> Iterator[str]:
+    '''
+    All 4096 octal modes as 4-digit mode arguments
+    '''
+    return ('{:04o}'.format(mode) for mode in range(CHMOD_MODE_BITS + 1))
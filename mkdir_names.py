@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+'''
+Seeded high-volume directory name generator
+
+Alphabets are precomputed once per generator and names are drawn in bulk
+batches, so millions of names can be generated without the generator
+becoming the bottleneck. All generators share one random number generator
+which is reseeded by pytest_mkdir_names plugin for every test and fixture,
+failures can be therefore replayed using the same seed.
+
+    names = mkdir_names.UTF8.batch(1000, 1, 63)
+    name = mkdir_names.generator(string.digits).name(10, 10)
+'''
+
+import functools
+import random
+import string
+from typing import Iterable, List, Optional
+
+
+NAME_MAX = 255  # max file name length in bytes
+
+# Code point ranges sampled by UTF-8 name generator, update as needed
+UTF8_CODE_POINT_RANGES = [
+    (0x0021, 0x0021),
+    (0x0023, 0x0026),
+    (0x0028, 0x007E),
+    (0x00A1, 0x00AC),
+    (0x00AE, 0x00FF),
+    (0x0100, 0x017F),
+    (0x0180, 0x024F),
+    (0x2C60, 0x2C7F),
+    (0x16A0, 0x16F0),
+    (0x0370, 0x0377),
+    (0x037A, 0x037E),
+    (0x0384, 0x038A),
+    (0x038C, 0x038C),
+]
+
+# Characters which can never be part of a file name
+_FORBIDDEN = {'\x00', '/'}
+
+# Names reserved by operating system, present in every directory
+RESERVED_NAMES = {'.', '..'}
+
+_random = random.Random()
+
+# Unique batch gives up after this many duplicate names in a row (per
+# requested name, plus fixed minimum)
+_MAX_STALE_FACTOR = 100
+_MAX_STALE_MIN = 1000
+
+
+def seed(value=None):
+    '''
+    Reseed random number generator shared by all name generators
+    '''
+    _random.seed(value)
+
+
+class NameGenerator:
+    '''
+    Random name generator with precomputed alphabet
+
+    alphabet: characters to draw from, NUL and '/' are always left out
+    rng: random.Random instance, shared module generator if not given
+    '''
+
+    def __init__(self, alphabet: Iterable[str], rng: Optional[random.Random] = None):
+        self.alphabet = [char for char in dict.fromkeys(alphabet) if char not in _FORBIDDEN]
+        self.rng = rng if rng is not None else _random
+        # Byte length check is needed only for alphabets with multi-byte characters
+        self.min_char_bytes = min(len(char.encode('utf-8')) for char in self.alphabet)
+        self.max_char_bytes = max(len(char.encode('utf-8')) for char in self.alphabet)
+
+    def name(self, min_chars: int = 1, max_chars: int = 20, max_bytes: int = NAME_MAX) -> str:
+        '''
+        Single random name, see batch()
+        '''
+        return self.batch(1, min_chars, max_chars, max_bytes)[0]
+
+    def batch(self, count: int, min_chars: int = 1, max_chars: int = 20,
+              max_bytes: int = NAME_MAX, unique: bool = False) -> List[str]:
+        '''
+        Generate count random names
+
+        min_chars, max_chars: range of name length in characters
+        max_bytes: max length of UTF-8 encoded name, longer names are
+            truncated at character boundary
+        unique: names are unique and never one of reserved '.' and '..' names,
+            ValueError if alphabet and length limits allow fewer than count
+            such names
+        '''
+        names = []
+        seen = set()
+
+        if unique:
+            available = self.name_space(min_chars, max_chars, max_bytes, limit=count)
+            if available < count:
+                raise ValueError("only {} unique names of {}-{} characters available, "
+                                 "{} requested".format(available, min_chars, max_chars, count))
+        # Names drawn since the last new one, bounds search when truncation
+        # at max_bytes leaves less names than estimated
+        stale = 0
+
+        while len(names) < count:
+            missing = count - len(names)
+            lengths = self.rng.choices(range(min_chars, max_chars + 1), k=missing)
+            chars = self.rng.choices(self.alphabet, k=sum(lengths))
+
+            position = 0
+            for length in lengths:
+                name = ''.join(chars[position:position + length])
+                position += length
+
+                if length * self.max_char_bytes > max_bytes:
+                    encoded = name.encode('utf-8')
+                    if len(encoded) > max_bytes:
+                        name = encoded[:max_bytes].decode('utf-8', errors='ignore')
+
+                if unique:
+                    if name in seen or name in RESERVED_NAMES or not name:
+                        stale += 1
+                        if stale > _MAX_STALE_FACTOR * count + _MAX_STALE_MIN:
+                            raise ValueError("only {} unique names of {}-{} characters found, "
+                                             "{} requested".format(len(names), min_chars,
+                                                                   max_chars, count))
+                        continue
+                    seen.add(name)
+                    stale = 0
+                names.append(name)
+
+        return names
+
+    def name_space(self, min_chars: int = 1, max_chars: int = 20, max_bytes: int = NAME_MAX,
+                   limit: Optional[int] = None) -> int:
+        '''
+        Number of distinct non-empty, non-reserved names batch() can generate,
+        upper estimate if names are truncated at max_bytes, counting stops
+        once limit is exceeded
+        '''
+        # Truncated names are shorter than drawn, but never below max_bytes
+        # worth of the widest characters
+        shortest = min(min_chars, max_bytes // self.max_char_bytes)
+        longest = min(max_chars, max_bytes // self.min_char_bytes)
+
+        total = 0
+        for length in range(max(shortest, 1), longest + 1):
+            total += len(self.alphabet) ** length
+            if limit is not None and total > limit + len(RESERVED_NAMES):
+                break
+        reserved = sum(1 for name in RESERVED_NAMES
+                       if shortest <= len(name) <= longest and set(name) <= set(self.alphabet))
+        return total - reserved
+
+
+@functools.lru_cache(maxsize=None)
+def generator(alphabet: str) -> NameGenerator:
+    '''
+    Cached generator for given alphabet, alphabet is precomputed only once
+    '''
+    return NameGenerator(alphabet)
+
+
+ASCII_LETTERS = generator(string.ascii_letters)
+
+UTF8 = NameGenerator(
+    chr(code_point) for first, last in UTF8_CODE_POINT_RANGES
+    for code_point in range(first, last + 1)
+)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+'''
+Option combination engine based on t-wise covering arrays
+
+Options are read from the option table of mkdir man page (docs/mkdir-1.txt),
+every option becomes a factor whose values are "not used" and its renderings
+(short and long form, with values from declared value domain). Instead of
+cartesian product of all factors, greedy covering array generator (AETG
+style) picks combinations until every t-tuple of factor values is present
+in at least one of them:
+
+    options = mkdir_pairwise.parse_man_options(mkdir_pairwise.DEFAULT_MAN_PAGE)
+    factors = mkdir_pairwise.option_factors(options, {'--mode': ['700', '8']})
+    rows = mkdir_pairwise.covering_array([len(factor.values) for factor in factors])
+
+Values which end processing of the whole command (like '--help') can be
+declared dominant, rows using them cover only tuples including them.
+'''
+
+import itertools
+import os
+import random
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+
+DEFAULT_MAN_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docs', 'mkdir-1.txt')
+
+# Option lines of man page, e.g. "-m, --mode=MODE", "-Z", "--context[=CTX]"
+_OPTION_RE = re.compile(
+    r'^\s{4,}(?:(?P<short>-\w)(?:,\s*|\s+|$))?(?P<long>--[\w-]+)?(?P<arg>\[?=[A-Z]+\]?)?')
+
+_SECTION_RE = re.compile(r'^[A-Z][A-Z ]+$')
+
+
+class Option(NamedTuple):
+    short: Optional[str]
+    long: Optional[str]
+    argument: Optional[str]  # argument name, e.g. 'MODE'
+    optional: bool = False   # argument may be left out
+
+    @property
+    def name(self) -> str:
+        return self.long or self.short
+
+
+class Factor(NamedTuple):
+    '''
+    Parameter of covering array, values are argument lists (None for not used)
+    '''
+    name: str
+    values: List[Optional[Tuple[str, ...]]]
+
+
+def parse_man_options(path) -> List[Option]:
+    '''
+    Options listed in DESCRIPTION section of man page text
+    '''
+    options = []
+    section = None
+
+    with open(path, encoding='utf-8') as man_file:
+        for line in man_file:
+            line = line.rstrip('\n')
+            if _SECTION_RE.match(line):
+                section = line.strip()
+                continue
+            if section != 'DESCRIPTION' or not line.lstrip().startswith('-'):
+                continue
+            # Option lines are indented less than their descriptions
+            if len(line) - len(line.lstrip()) > 8:
+                continue
+
+            match = _OPTION_RE.match(line)
+            if match is None or not (match.group('short') or match.group('long')):
+                continue
+            argument = match.group('arg')
+            options.append(Option(
+                match.group('short'), match.group('long'),
+                argument.strip('[]=') if argument else None,
+                bool(argument and argument.startswith('['))))
+
+    return options
+
+
+def option_factors(options: Sequence[Option], domains: Dict[str, Sequence[str]]) -> List[Factor]:
+    '''
+    Factor per option, values alternate short and long forms
+
+    domains: option name -> argument values, options with mandatory argument
+        and no domain are left out, options with optional argument and no
+        domain are used without argument
+    '''
+    factors = []
+    for option in options:
+        forms = [form for form in (option.short, option.long) if form]
+        values: List[Optional[Tuple[str, ...]]] = [None]
+
+        if option.argument is None:
+            values.extend((form,) for form in forms)
+        elif option.name in domains:
+            for index, value in enumerate(domains[option.name]):
+                form = forms[index % len(forms)]
+                values.append((form, value) if form == option.short else (form + '=' + value,))
+        elif option.optional:
+            values.append((option.long,))
+        else:
+            continue
+
+        factors.append(Factor(option.name, values))
+    return factors
+
+
+def _row_tuples(row: Sequence[int], strength: int, dominant: Dict[int, Set[int]]) -> Set:
+    factors = range(len(row))
+    masking = [factor for factor in factors if row[factor] in dominant.get(factor, ())]
+    tuples = set()
+    for combination in itertools.combinations(factors, strength):
+        if masking and not any(factor in combination for factor in masking):
+            continue
+        tuples.add((combination, tuple(row[factor] for factor in combination)))
+    return tuples
+
+
+def covering_array(sizes: Sequence[int], strength: int = 2, seed: int = 0,
+                   candidates: int = 20,
+                   dominant: Optional[Dict[int, Set[int]]] = None) -> List[List[int]]:
+    '''
+    Rows of value indices covering every strength-tuple of factor values
+
+    sizes: number of values of every factor
+    seed: seed of tie breaking, same arguments always give the same rows
+    candidates: rows generated per step, the one covering most is kept
+    dominant: factor index -> value indices masking all other factors
+    '''
+    dominant = dominant or {}
+    rng = random.Random(seed)
+    factors = range(len(sizes))
+    strength = min(strength, len(sizes))
+
+    uncovered = set()
+    for combination in itertools.combinations(factors, strength):
+        for values in itertools.product(*(range(sizes[factor]) for factor in combination)):
+            uncovered.add((combination, values))
+
+    rows = []
+    while uncovered:
+        pool = sorted(uncovered)
+        best_row, best_cover = None, set()
+
+        for _ in range(candidates):
+            combination, values = rng.choice(pool)
+            row: List[Optional[int]] = [None] * len(sizes)
+            for factor, value in zip(combination, values):
+                row[factor] = value
+
+            remaining = [factor for factor in factors if row[factor] is None]
+            rng.shuffle(remaining)
+            for factor in remaining:
+                # Value covering most uncovered tuples among already assigned factors
+                assigned = [other for other in factors if row[other] is not None]
+                scores = []
+                for value in range(sizes[factor]):
+                    score = 0
+                    for others in itertools.combinations(assigned, strength - 1):
+                        key = tuple(sorted(others + (factor,)))
+                        tuple_values = tuple(value if member == factor else row[member]
+                                             for member in key)
+                        if (key, tuple_values) in uncovered:
+                            score += 1
+                    scores.append((score, rng.random(), value))
+                row[factor] = max(scores)[2]
+
+            cover = _row_tuples(row, strength, dominant) & uncovered
+            if len(cover) > len(best_cover):
+                best_row, best_cover = row, cover
+
+        if not best_cover:
+            # Only masked tuples left, cover them one per row
+            combination, values = pool[0]
+            best_row = [0] * len(sizes)
+            for factor, value in zip(combination, values):
+                best_row[factor] = value
+            best_cover = {(combination, values)}
+
+        rows.append(best_row)
+        uncovered -= best_cover
+
+    return rows
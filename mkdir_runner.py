@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+'''
+Pluggable process runner for mkdir_tester test suite
+
+Provides sh-like interface used by all test modules:
+
+    import mkdir_runner
+
+    try:
+        mkdir_runner.mkdir('-p', path, _err=err_output)
+    except mkdir_runner.ErrorReturnCode as exc:
+        ...
+
+Commands are executed by currently selected backend:
+      - "spawn": lean os.posix_spawn() and pipe based runner (default)
+      - "forkserver": runner delegating spawns to long-lived helper process
+      - "sh": runner based on 'sh' package
+'''
+
+import os
+import resource
+import selectors
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+
+# Process-wide state (working directory, umask) may be temporarily
+# changed while spawning a child, serialize such spawns
+_spawn_lock = threading.RLock()
+
+# Size of argv/envp pointer and safety margin for auxiliary data passed
+# by kernel on the new process stack, used for ARG_MAX computations
+_POINTER_SIZE = 8
+_ARG_MAX_MARGIN = 4096
+
+
+class CommandNotFound(ImportError):
+    pass
+
+
+class Usage(NamedTuple):
+    '''
+    Resource usage of child processes
+
+    user, system: CPU time in seconds
+    maxrss: max resident set size in kB, 0 if unknown
+    nvcsw, nivcsw: voluntary and involuntary context switches
+    inblock, oublock: block input and output operations
+    '''
+    user: float = 0.0
+    system: float = 0.0
+    maxrss: int = 0
+    nvcsw: int = 0
+    nivcsw: int = 0
+    inblock: int = 0
+    oublock: int = 0
+
+    @classmethod
+    def from_rusage(cls, rusage) -> 'Usage':
+        return cls(rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss, rusage.ru_nvcsw,
+                   rusage.ru_nivcsw, rusage.ru_inblock, rusage.ru_oublock)
+
+    def combine(self, other: 'Usage') -> 'Usage':
+        '''
+        Usage of both, counters are summed, max RSS is the larger one
+        '''
+        return Usage(*(max(mine, theirs) if field == 'maxrss' else mine + theirs
+                       for field, mine, theirs in zip(self._fields, self, other)))
+
+    def since(self, earlier: 'Usage') -> 'Usage':
+        '''
+        Counters accumulated after earlier snapshot of cumulative usage, max
+        RSS is kept only if the high-water mark grew since then
+        '''
+        return Usage(*((mine if mine > theirs else 0) if field == 'maxrss' else mine - theirs
+                       for field, mine, theirs in zip(self._fields, self, earlier)))
+
+
+# Usage of children reaped by fork server helper instead of this process
+_external_usage = Usage()
+# Meters receiving max RSS of every finished child with known usage
+_meters: List['UsageMeter'] = []
+_usage_lock = threading.Lock()
+
+
+def _account(usage: Usage, external: bool = False):
+    global _external_usage
+
+    with _usage_lock:
+        if external:
+            _external_usage = _external_usage.combine(usage)
+        for meter in _meters:
+            meter._peak_rss = max(meter._peak_rss, usage.maxrss)
+
+
+def children_usage() -> Usage:
+    '''
+    Cumulative usage of all finished child processes, including children
+    of fork server helper
+    '''
+    with _usage_lock:
+        external = _external_usage
+    return Usage.from_rusage(resource.getrusage(resource.RUSAGE_CHILDREN)).combine(external)
+
+
+class UsageMeter:
+    '''
+    Measures child process usage between consecutive lap() calls
+
+    Counters cover every finished child (including asyncio and helper
+    script subprocesses), max RSS is the largest one of children with
+    per-process usage, or children high-water mark if it grew.
+    '''
+
+    def __init__(self):
+        self._peak_rss = 0
+        self._last = children_usage()
+        with _usage_lock:
+            _meters.append(self)
+
+    def lap(self) -> Usage:
+        now = children_usage()
+        with _usage_lock:
+            peak_rss = self._peak_rss
+            self._peak_rss = 0
+        usage = now.since(self._last)
+        self._last = now
+        if peak_rss:
+            usage = usage._replace(maxrss=peak_rss)
+        return usage
+
+    def close(self):
+        with _usage_lock:
+            if self in _meters:
+                _meters.remove(self)
+
+
+class Result:
+    '''
+    Outcome of single command invocation
+
+    argv: executed command line
+    exit_code: exit code, negative signal number if child was killed by signal
+    stdout, stderr: captured output (bytes)
+    elapsed: spawn-to-exit wall time in seconds
+    timed_out: child was killed after exceeding its time limit
+    rusage: Usage of the child, None if not known
+    '''
+
+    def __init__(self, argv, exit_code: int, stdout: bytes, stderr: bytes, elapsed: float,
+                 timed_out: bool = False, rusage: Optional[Usage] = None):
+        self.argv = argv
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.elapsed = elapsed
+        self.timed_out = timed_out
+        self.rusage = rusage
+
+    @property
+    def status(self) -> str:
+        '''
+        Exit code or timeout, e.g. for failure messages
+        '''
+        if self.timed_out:
+            return "timed out after {:.1f}s".format(self.elapsed)
+        return "exit code {}".format(self.exit_code)
+
+    def __repr__(self):
+        return "Result(argv={!r}, {})".format(self.argv, self.status)
+
+
+# Callables invoked with Result of every finished command invocation run
+# through Command or mkdir_async, e.g. for latency statistics
+observers: List[Callable[[Result], None]] = []
+
+
+# Callables invoked with path of executable every time Command resolves it
+# for use, e.g. for tracking which checks depend on tested binary
+path_observers: List[Callable[[str], None]] = []
+
+
+def notify(result: Result):
+    '''
+    Pass result of finished invocation to all observers
+    '''
+    for observer in observers:
+        observer(result)
+
+
+class ErrorReturnCode(Exception):
+    '''
+    Raised when command exits with unexpected exit code, mirrors sh.ErrorReturnCode
+    '''
+
+    def __init__(self, result: Result):
+        self.result = result
+        self.full_cmd = ' '.join(os.fsdecode(arg) for arg in result.argv)
+        self.exit_code = result.exit_code
+        self.stdout = result.stdout
+        self.stderr = result.stderr
+
+        msg = "\n\n  RAN: {}\n\n  EXIT CODE: {}\n\n  STDOUT:\n{}\n\n  STDERR:\n{}".format(
+            self.full_cmd, self.exit_code,
+            self.stdout.decode('utf-8', errors='replace'),
+            self.stderr.decode('utf-8', errors='replace'))
+        super().__init__(msg)
+
+
+class TimeoutExpired(Exception):
+    '''
+    Raised when command was killed after exceeding its time limit, not an
+    ErrorReturnCode so checks expecting some exit code don't mistake it
+    for one
+    '''
+
+    def __init__(self, result: Result):
+        self.result = result
+        self.full_cmd = ' '.join(os.fsdecode(arg) for arg in result.argv)
+        super().__init__("{} {}".format(self.full_cmd, result.status))
+
+
+class _ProcessContext:
+    '''
+    Temporarily applies child working directory and umask to this process
+
+    Neither os.posix_spawn() nor 'sh' can set umask of the child, and
+    posix_spawn() can't change its working directory, so both are set
+    in the parent around the spawn and inherited by the child. Working
+    directory may be given as open directory descriptor, which allows
+    running commands in directories deeper than PATH_MAX.
+    '''
+
+    def __init__(self, cwd=None, umask: Optional[int] = None):
+        self.cwd = cwd
+        self.umask = umask
+        self._cwd_fd = None
+        self._umask_saved = None
+
+    def __enter__(self):
+        _spawn_lock.acquire()
+        try:
+            if self.cwd is not None:
+                self._cwd_fd = os.open('.', os.O_RDONLY | os.O_DIRECTORY)
+                if isinstance(self.cwd, int):
+                    os.fchdir(self.cwd)
+                else:
+                    os.chdir(self.cwd)
+            if self.umask is not None:
+                self._umask_saved = os.umask(self.umask)
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if self._umask_saved is not None:
+                os.umask(self._umask_saved)
+            if self._cwd_fd is not None:
+                os.fchdir(self._cwd_fd)
+                os.close(self._cwd_fd)
+        finally:
+            _spawn_lock.release()
+
+
+class Backend:
+    '''
+    Base class of process runner backends
+    '''
+
+    name = None
+
+    def run(self, argv: List, cwd=None, env: Optional[Dict] = None,
+            umask: Optional[int] = None) -> Result:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SpawnBackend(Backend):
+    '''
+    Runs commands using os.posix_spawn() with STDOUT and STDERR captured via pipes
+    '''
+
+    name = 'spawn'
+
+    def run(self, argv, cwd=None, env=None, umask=None):
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+
+        # Pipe descriptors are not inheritable, only dup2-ed copies leak to the child
+        file_actions = [
+            (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+            (os.POSIX_SPAWN_DUP2, out_w, 1),
+            (os.POSIX_SPAWN_DUP2, err_w, 2),
+        ]
+
+        try:
+            with _ProcessContext(cwd, umask):
+                start = time.perf_counter()
+                pid = os.posix_spawn(argv[0], argv, os.environ if env is None else env,
+                                     file_actions=file_actions)
+        except BaseException:
+            for fd in (out_r, err_r):
+                os.close(fd)
+            raise
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+
+        stdout, stderr = _read_pipes(out_r, err_r)
+        _, status, rusage = os.wait4(pid, 0)
+        elapsed = time.perf_counter() - start
+
+        usage = Usage.from_rusage(rusage)
+        _account(usage)
+        return Result(argv, os.waitstatus_to_exitcode(status), stdout, stderr, elapsed,
+                      rusage=usage)
+
+
+class ShBackend(Backend):
+    '''
+    Runs commands using 'sh' package
+
+    Usage of the child is difference of RUSAGE_CHILDREN around the call,
+    approximate if other children finish at the same time.
+    '''
+
+    name = 'sh'
+
+    def __init__(self):
+        import sh
+        self._sh = sh
+        # sh 2.x returns plain output string unless asked for RunningCommand object
+        self._call_args = {'_return_cmd': True} if int(sh.__version__.split('.')[0]) >= 2 else {}
+
+    def run(self, argv, cwd=None, env=None, umask=None):
+        # sh encodes str arguments and stringifies bytes ones, pass every
+        # argument as latin-1 text encoded back to its exact original bytes
+        args = [os.fsencode(arg).decode('latin-1') for arg in argv[1:]]
+        call_args = dict(self._call_args, _ok_code=range(-255, 256), _encoding='latin-1')
+        if env is not None:
+            call_args['_env'] = env
+
+        with _ProcessContext(cwd, umask):
+            before = Usage.from_rusage(resource.getrusage(resource.RUSAGE_CHILDREN))
+            start = time.perf_counter()
+            try:
+                process = self._sh.Command(argv[0])(*args, **call_args)
+                exit_code = process.exit_code
+            except self._sh.SignalException as exc:
+                process = exc
+                exit_code = exc.exit_code
+            elapsed = time.perf_counter() - start
+            usage = Usage.from_rusage(resource.getrusage(resource.RUSAGE_CHILDREN)).since(before)
+
+        _account(usage)
+        return Result(argv, exit_code, process.stdout, process.stderr, elapsed, rusage=usage)
+
+
+class ForkServerBackend(Backend):
+    '''
+    Delegates spawning of commands to long-lived mkdir_forkserver helper process
+
+    Helper is started lazily on first invocation and runs in isolated mode
+    so its address space stays small compared to pytest process.
+    '''
+
+    name = 'forkserver'
+
+    def __init__(self):
+        self._server = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        import mkdir_forkserver
+        self._forkserver = mkdir_forkserver
+        self._server = subprocess.Popen(
+            [sys.executable, '-I', '-S', mkdir_forkserver.__file__],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+
+    def run(self, argv, cwd=None, env=None, umask=None):
+        # Helper has its own working directory, always send ours resolved
+        if cwd is None:
+            cwd = os.getcwd()
+        elif isinstance(cwd, int):
+            # Entering the descriptor link works even past PATH_MAX
+            cwd = '/proc/{}/fd/{}'.format(os.getpid(), cwd)
+        elif not os.path.isabs(os.fspath(cwd)):
+            cwd = os.path.join(os.getcwd(), os.fspath(cwd))
+        request = {
+            'argv': argv,
+            'cwd': os.fspath(cwd),
+            'env': dict(os.environ if env is None else env),
+            'umask': umask,
+        }
+
+        with self._lock:
+            if self._server is None:
+                self._start()
+            self._forkserver.write_frame(self._server.stdin.fileno(), request)
+            response = self._forkserver.read_frame(self._server.stdout.fileno())
+
+        if response is None:
+            self.close()
+            raise RuntimeError("mkdir fork server terminated unexpectedly")
+        if 'error' in response:
+            # Same exception as spawn backend raises, e.g. FileNotFoundError
+            raise OSError(*response['error'])
+
+        usage = Usage(*response['rusage'])
+        _account(usage, external=True)
+        return Result(argv, response['exit_code'], response['stdout'], response['stderr'],
+                      response['elapsed'], rusage=usage)
+
+    def close(self):
+        with self._lock:
+            if self._server is not None:
+                self._server.stdin.close()
+                self._server.wait()
+                self._server.stdout.close()
+                self._server = None
+
+
+BACKENDS = {
+    SpawnBackend.name: SpawnBackend,
+    ForkServerBackend.name: ForkServerBackend,
+    ShBackend.name: ShBackend,
+}
+
+DEFAULT_BACKEND = SpawnBackend.name
+
+_backend: Backend = SpawnBackend()
+
+
+def _read_pipes(out_fd: int, err_fd: int):
+    '''
+    Read both pipes until EOF without risking deadlock on full pipe buffer
+    '''
+    chunks = {out_fd: [], err_fd: []}
+
+    with selectors.DefaultSelector() as selector:
+        for fd in chunks:
+            selector.register(fd, selectors.EVENT_READ)
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, 65536)
+                if data:
+                    chunks[key.fd].append(data)
+                else:
+                    selector.unregister(key.fd)
+                    os.close(key.fd)
+
+    return b''.join(chunks[out_fd]), b''.join(chunks[err_fd])
+
+
+def check_exit_code(result: Result, ok_code=0) -> Result:
+    '''
+    Raise ErrorReturnCode unless result exit code is one of ok_code (int or list),
+    TimeoutExpired if command was killed after its time limit
+    '''
+    if result.timed_out:
+        raise TimeoutExpired(result)
+    ok_codes = (ok_code,) if isinstance(ok_code, int) else ok_code
+    if result.exit_code not in ok_codes:
+        raise ErrorReturnCode(result)
+    return result
+
+
+def arg_size(arg) -> int:
+    '''
+    Number of bytes argument (or environment entry) takes in ARG_MAX budget
+    '''
+    if not isinstance(arg, bytes):
+        arg = os.fsencode(arg if isinstance(arg, (str, os.PathLike)) else str(arg))
+    return len(arg) + 1 + _POINTER_SIZE
+
+
+def arg_max_budget(env: Optional[Dict] = None) -> int:
+    '''
+    Bytes available for command line arguments given the environment
+    (current environment if not given) passed to the command
+    '''
+    env = os.environ if env is None else env
+    env_size = sum(arg_size(key) + arg_size(value) - 1 - _POINTER_SIZE
+                   for key, value in env.items())
+    return os.sysconf('SC_ARG_MAX') - env_size - _ARG_MAX_MARGIN
+
+
+def split_args(args: Iterable, fixed_args: Iterable = (), env: Optional[Dict] = None,
+               max_count: Optional[int] = None) -> Iterator[List]:
+    '''
+    Split args into chunks which can be passed to a single command invocation
+
+    fixed_args: arguments passed to every invocation (command path, options)
+    env: environment of the command, current environment if not given
+    max_count: max number of args per chunk, limited only by ARG_MAX if None
+    '''
+    budget = arg_max_budget(env) - sum(arg_size(arg) for arg in fixed_args)
+    chunk = []
+    used = 0
+
+    for arg in args:
+        size = arg_size(arg)
+        if chunk and (used + size > budget or len(chunk) == max_count):
+            yield chunk
+            chunk = []
+            used = 0
+        chunk.append(arg)
+        used += size
+
+    if chunk:
+        yield chunk
+
+
+def get_backend() -> Backend:
+    return _backend
+
+
+def set_backend(name: str) -> Backend:
+    '''
+    Select backend used by all commands, returns the new backend
+    '''
+    global _backend
+
+    if name not in BACKENDS:
+        raise ValueError("Unknown runner backend '{}', choose from: {}".format(
+            name, ", ".join(sorted(BACKENDS))))
+
+    if _backend.name != name:
+        _backend.close()
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+class Command:
+    '''
+    sh.Command-like callable wrapper of an executable
+
+    Positional arguments are passed to the command as they are, special
+    keyword arguments mirror 'sh' package:
+        _cwd: working directory of the command, path or directory descriptor
+        _env: complete environment of the command
+        _umask: umask of the command
+        _out, _err: file-like objects receiving decoded STDOUT/STDERR
+        _ok_code: exit code or list of exit codes not raising ErrorReturnCode
+    '''
+
+    def __init__(self, name):
+        self._name = os.fspath(name)
+        self._resolved = None
+
+    @property
+    def _path(self) -> str:
+        if self._resolved is None:
+            if os.sep in self._name:
+                # Same check as 'sh' does for paths
+                path = os.path.abspath(self._name)
+                if not (os.path.isfile(path) and os.access(path, os.X_OK)):
+                    raise CommandNotFound(self._name)
+                self._resolved = path
+            else:
+                self._resolved = shutil.which(self._name)
+                if self._resolved is None:
+                    raise CommandNotFound(self._name)
+        for observer in path_observers:
+            observer(self._resolved)
+        return self._resolved
+
+    def __call__(self, *args, _cwd=None, _env=None, _umask=None, _out=None, _err=None,
+                 _ok_code=0) -> Result:
+        result = _backend.run(self._argv(*args), cwd=_cwd, env=_env, umask=_umask)
+        notify(result)
+
+        if _out is not None:
+            _out.write(result.stdout.decode('utf-8', errors='replace'))
+        if _err is not None:
+            _err.write(result.stderr.decode('utf-8', errors='replace'))
+
+        return check_exit_code(result, _ok_code)
+
+    def _argv(self, *args) -> List:
+        argv = [self._path]
+        argv.extend(os.fspath(arg) if isinstance(arg, (str, bytes, os.PathLike)) else str(arg)
+                    for arg in args)
+        return argv
+
+    def __repr__(self):
+        return "Command({!r})".format(self._name)
+
+
+mkdir = Command('mkdir')
+
+
+def set_binary(name):
+    '''
+    Select mkdir implementation run by all modules, name on PATH or path
+    '''
+    global mkdir
+    mkdir = Command(name)
+    return mkdir
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+'''
+Duration-balanced test sharding and merging of shard results
+
+Test groups are assigned to shards using longest processing time first
+(LPT) rule: groups sorted by their historical duration are taken one by one
+and given to the shard with the least total duration so far. Every test
+class (or module for module-level tests) forms one group, so class and
+module scoped fixtures and incremental checks stay together.
+
+Shards are run with '--report-jsonl', merging their result files prints
+single result stream and final summary in the custom output format:
+
+    python3 mkdir_shard.py merge shard1.jsonl shard2.jsonl shard3.jsonl
+'''
+
+import heapq
+import json
+import statistics
+import sys
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from pytest_custom_output import format_summary
+
+
+# Assumed duration of checks without history when no history exists at all
+DEFAULT_DURATION = 1.0
+
+# user_properties key holding position of the check in unsharded collection
+COLLECTION_INDEX = 'collection_index'
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    '''
+    Shard index and count from 'i/n' string, i is 1-based
+    '''
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError("invalid shard '{}', use i/n, e.g. 1/4".format(value))
+    if not 1 <= index <= count:
+        raise ValueError("invalid shard '{}', i must be between 1 and n".format(value))
+    return index, count
+
+
+def group_id(nodeid: str) -> str:
+    '''
+    Sharding group of check, node id of its class or module
+    '''
+    parts = nodeid.split('::')
+    return '::'.join(parts[:2]) if len(parts) > 2 else parts[0]
+
+
+def read_durations(paths: Iterable) -> Dict[str, float]:
+    '''
+    Durations of checks from JSONL result files, later files take precedence
+    '''
+    durations = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as records_file:
+            for line in records_file:
+                if line.strip():
+                    record = json.loads(line)
+                    durations[record['nodeid']] = record['duration']
+    return durations
+
+
+def assign_groups(nodeids: Sequence[str], durations: Dict[str, float],
+                  count: int) -> Dict[str, int]:
+    '''
+    Assign groups of checks to count shards, returns dict group id -> shard index (0-based)
+
+    Checks without history are assumed to take median duration of known checks.
+    '''
+    known = [durations[nodeid] for nodeid in nodeids if nodeid in durations]
+    default = statistics.median(known) if known else DEFAULT_DURATION
+
+    groups = {}
+    for nodeid in nodeids:
+        group = group_id(nodeid)
+        groups[group] = groups.get(group, 0.0) + durations.get(nodeid, default)
+
+    # Heap of (total duration, shard index), ties resolved by lower index
+    shards = [(0.0, index) for index in range(count)]
+    assignment = {}
+    for group, duration in sorted(groups.items(), key=lambda item: (-item[1], item[0])):
+        total, index = heapq.heappop(shards)
+        assignment[group] = index
+        heapq.heappush(shards, (total + duration, index))
+    return assignment
+
+
+def merge_records(paths: Sequence) -> List[Dict]:
+    '''
+    Records of all shard result files in unsharded collection order
+    '''
+    records = []
+    for file_index, path in enumerate(paths):
+        with open(path, encoding='utf-8') as records_file:
+            for line_index, line in enumerate(records_file):
+                if line.strip():
+                    record = json.loads(line)
+                    position = record.get('properties', {}).get(COLLECTION_INDEX)
+                    # Records without collection index keep order of files and lines
+                    key = (0, position, 0) if position is not None else (1, file_index, line_index)
+                    records.append((key, record))
+    records.sort(key=lambda entry: entry[0])
+    return [record for _, record in records]
+
+
+def merge(paths: Sequence, out=None) -> int:
+    '''
+    Print merged result lines and final summary, returns exit code
+    '''
+    out = out if out is not None else sys.stdout
+    counts = {}
+    n_tests = 0
+
+    for record in merge_records(paths):
+        for line in record.get('lines', []):
+            out.write(line + "\n")
+        for key in record.get('stats', []):
+            counts[key] = counts.get(key, 0) + 1
+        if 'call' in record['phases']:
+            n_tests += 1
+
+    if n_tests:
+        out.write("\n" + format_summary(counts, n_tests) + "\n")
+    out.flush()
+
+    return 1 if counts.get('F') or counts.get('E') or counts.get('u') else 0
+
+
+def main(argv: Sequence[str]) -> int:
+    if len(argv) < 2 or argv[0] != 'merge':
+        print("usage: mkdir_shard.py merge SHARD_JSONL [SHARD_JSONL ...]", file=sys.stderr)
+        return 2
+    return merge(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
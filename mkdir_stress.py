@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+'''
+Concurrent 'mkdir -p' contention stress
+
+Runs many 'mkdir -p' invocations on shared and overlapping path sets at the
+same time, so parallel creators race on the same ancestor directories
+(EEXIST/ENOENT races) the way concurrent production jobs do:
+
+    path_sets, leaves = mkdir_stress.overlapping_path_sets(4, 3, 200, 8)
+    stress = mkdir_stress.run_stress(tmpdir, path_sets, concurrency=16, pool='threads')
+    assert not stress.failed
+    assert mkdir_verify.verify_tree(tmpdir, leaves).ok
+
+Two pools of concurrent creators are available:
+      - "async": child processes managed by mkdir_async engine
+      - "threads": thread pool calling mkdir_runner, only 'spawn' backend
+        runs commands in parallel, other backends serialize invocations
+'''
+
+import concurrent.futures
+import itertools
+import math
+import time
+from typing import List, Sequence, Tuple
+
+import mkdir_async
+import mkdir_runner
+
+
+POOLS = ('async', 'threads')
+
+
+class StressResult:
+    '''
+    Results of single stress run
+
+    results: mkdir_runner.Result of every invocation, in invocation order
+    wall: wall clock time of the whole run in seconds
+    '''
+
+    def __init__(self, results: List[mkdir_runner.Result], wall: float):
+        self.results = results
+        self.wall = wall
+
+    @property
+    def failed(self) -> List[mkdir_runner.Result]:
+        return [result for result in self.results if result.exit_code != 0 or result.timed_out]
+
+    @property
+    def throughput(self) -> float:
+        '''
+        Completed invocations per second
+        '''
+        return len(self.results) / self.wall if self.wall else 0.0
+
+    def latency(self, fraction: float) -> float:
+        '''
+        Nearest-rank percentile of invocation latency in seconds, e.g. 0.99 for p99
+        '''
+        elapsed = sorted(result.elapsed for result in self.results)
+        if not elapsed:
+            return 0.0
+        return elapsed[max(math.ceil(fraction * len(elapsed)) - 1, 0)]
+
+
+def overlapping_path_sets(fanout: int, depth: int, invocations: int,
+                          operands: int) -> Tuple[List[List[str]], List[str]]:
+    '''
+    Operand lists of invocations creating one shared tree
+
+    Tree has given fanout and depth below common 'shared' directory, every
+    invocation creates operands leaves and shares half of them with the
+    previous invocation. Every other invocation lists its leaves in reverse
+    order, so ancestors are raced from both ends of the tree.
+
+    Returns tuple (operand lists, all leaf paths)
+    '''
+    leaves = ['/'.join(('shared',) + tuple('n{}'.format(index) for index in path))
+              for path in itertools.product(range(fanout), repeat=depth)]
+    stride = max(operands // 2, 1)
+
+    if invocations * stride < len(leaves):
+        raise ValueError("{} invocations of {} operands can't cover all {} leaves".format(
+            invocations, operands, len(leaves)))
+
+    path_sets = []
+    for invocation in range(invocations):
+        paths = [leaves[(invocation * stride + offset) % len(leaves)] for offset in range(operands)]
+        path_sets.append(paths[::-1] if invocation % 2 else paths)
+
+    return path_sets, leaves
+
+
+def run_stress(root, path_sets: Sequence[Sequence[str]], concurrency: int,
+               pool: str = 'async') -> StressResult:
+    '''
+    Run 'mkdir -p' with every operand list in root, concurrency at a time
+
+    pool: one of POOLS
+    '''
+    if pool not in POOLS:
+        raise ValueError("Unknown stress pool '{}', use one of: {}".format(pool, ", ".join(POOLS)))
+
+    root = str(root)
+    start = time.perf_counter()
+
+    if pool == 'async':
+        results = mkdir_async.run_all({
+            index: mkdir_async.Invocation(('-p',) + tuple(paths), cwd=root)
+            for index, paths in enumerate(path_sets)
+        }, concurrency=concurrency)
+        results = [results[index] for index in range(len(path_sets))]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(
+                lambda paths: mkdir_runner.mkdir('-p', *paths, _cwd=root, _ok_code=range(256)),
+                path_sets))
+
+    return StressResult(results, time.perf_counter() - start)
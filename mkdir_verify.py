@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+'''
+Bulk verification of created directory trees
+
+Compares expected directory names with the actual content of the tree
+using one os.scandir() pass per directory containing expected paths
+instead of one stat call per expected path. Directories are opened relative
+to their parent directory descriptor, so trees deeper than PATH_MAX can be
+verified as well.
+
+Trees too deep for shutil.rmtree() recursion can be removed by remove_tree().
+
+    result = mkdir_verify.verify_tree(tmpdir, ['a', 'b/c', 'b/d'], mode=0o755)
+    assert result.ok, "Invalid directory tree: {}".format(result.describe())
+'''
+
+import os
+import stat
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class VerifyResult:
+    '''
+    Differences between expected and actual directory tree
+
+    missing: expected paths which do not exist
+    extra: unexpected entries found in verified directories
+    wrong_type: expected paths which exist but are not directories
+    wrong_mode: tuples (path, expected mode, actual mode)
+    '''
+
+    def __init__(self):
+        self.missing: List[str] = []
+        self.extra: List[str] = []
+        self.wrong_type: List[str] = []
+        self.wrong_mode: List[Tuple[str, int, int]] = []
+        self.checked = 0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.extra or self.wrong_type or self.wrong_mode)
+
+    def describe(self, limit: int = 5) -> str:
+        '''
+        Short human readable summary listing at most limit paths per problem
+        '''
+        def sample(items, template="'{}'"):
+            shown = ", ".join(template.format(*item) if isinstance(item, tuple)
+                              else template.format(item) for item in items[:limit])
+            if len(items) > limit:
+                shown += " and {} more".format(len(items) - limit)
+            return shown
+
+        problems = []
+        if self.missing:
+            problems.append("missing {}".format(sample(self.missing)))
+        if self.extra:
+            problems.append("unexpected {}".format(sample(self.extra)))
+        if self.wrong_type:
+            problems.append("not a directory {}".format(sample(self.wrong_type)))
+        if self.wrong_mode:
+            problems.append("wrong mode {}".format(
+                sample(self.wrong_mode, "'{}' ({:04o} expected, {:04o} found)")))
+        return "; ".join(problems)
+
+
+def _build_tree(paths: Iterable) -> Dict:
+    # Nested dict of path components, parents of every path are expected too
+    tree = {}
+    for path in paths:
+        node = tree
+        for component in os.fsdecode(path).split('/'):
+            if component:
+                node = node.setdefault(component, {})
+    return tree
+
+
+def verify_tree(root, expected: Iterable, mode: Optional[int] = None,
+                allow_extra: bool = False) -> VerifyResult:
+    '''
+    Verify that root contains exactly the expected directories
+
+    root: directory containing the expected tree
+    expected: paths relative to root (using '/' as separator), parent
+        directories of every path are expected as well
+    mode: expected permission bits (including setuid/setgid/sticky) of all
+        expected directories, not checked if None
+    allow_extra: do not report unexpected entries, only directories
+        containing expected paths are searched for unexpected entries
+    '''
+    result = VerifyResult()
+    tree = _build_tree(expected)
+
+    # Depth-first walk, subdirectories are opened relative to descriptor of
+    # their parent which stays open only while it has unvisited subdirectories
+    root_fd = os.open(os.fspath(root), os.O_RDONLY | os.O_DIRECTORY)
+    pending = {root_fd: 1}
+    stack = [(None, root_fd, '', tree)]
+
+    try:
+        while stack:
+            parent_fd, name, dir_path, node = stack.pop()
+            if parent_fd is None:
+                dir_fd = name
+            else:
+                dir_fd = os.open(name, os.O_RDONLY | os.O_DIRECTORY, dir_fd=parent_fd)
+                pending[dir_fd] = 1
+                _release(pending, parent_fd)
+
+            with os.scandir(dir_fd) as entries:
+                found = {os.fsdecode(entry.name): entry for entry in entries}
+
+            for name, children in node.items():
+                path = dir_path + name
+                result.checked += 1
+                entry = found.pop(name, None)
+
+                if entry is None:
+                    result.missing.append(path)
+                    # Descendants can't exist either
+                    result.missing.extend(path + '/' + descendant
+                                          for descendant in _flatten(children))
+                    continue
+
+                if not entry.is_dir(follow_symlinks=False):
+                    result.wrong_type.append(path)
+                    continue
+
+                if mode is not None:
+                    actual = stat.S_IMODE(entry.stat(follow_symlinks=False).st_mode)
+                    if actual != mode:
+                        result.wrong_mode.append((path, mode, actual))
+
+                if children:
+                    pending[dir_fd] += 1
+                    stack.append((dir_fd, entry.name, path + '/', children))
+
+            if not allow_extra:
+                result.extra.extend(dir_path + name for name in sorted(found))
+            _release(pending, dir_fd)
+    finally:
+        for fd in pending:
+            os.close(fd)
+
+    return result
+
+
+def _release(pending: Dict[int, int], fd: int):
+    pending[fd] -= 1
+    if not pending[fd]:
+        del pending[fd]
+        os.close(fd)
+
+
+def _flatten(tree: Dict) -> List[str]:
+    paths = []
+    stack = [('', tree)]
+    while stack:
+        prefix, node = stack.pop()
+        for name, children in node.items():
+            paths.append(prefix + name)
+            stack.append((prefix + name + '/', children))
+    return paths
+
+
+# Prefix of temporary names given to entries hoisted by remove_tree()
+_HOISTED_PREFIX = '.remove_tree.'
+
+
+def remove_tree(root):
+    '''
+    Remove directory root with all its content, regardless of tree depth
+
+    Instead of recursing into subdirectories, content of every directory is
+    moved up into root and the emptied directory is removed, so only two
+    descriptors are open at any time and every entry is visited once.
+    Directories which can't be read or written are made accessible first.
+    '''
+    root_fd = os.open(os.fspath(root), os.O_RDONLY | os.O_DIRECTORY)
+    hoisted = 0
+
+    try:
+        with os.scandir(root_fd) as entries:
+            pending = [(entry.name, entry.is_dir(follow_symlinks=False)) for entry in entries]
+
+        while pending:
+            name, is_dir = pending.pop()
+            if not is_dir:
+                os.unlink(name, dir_fd=root_fd)
+                continue
+
+            try:
+                dir_fd = os.open(name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW,
+                                 dir_fd=root_fd)
+            except PermissionError:
+                # Directories created with restrictive mode (e.g. 'mkdir -m 0')
+                os.chmod(name, stat.S_IRWXU, dir_fd=root_fd)
+                dir_fd = os.open(name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW,
+                                 dir_fd=root_fd)
+            try:
+                with os.scandir(dir_fd) as entries:
+                    children = [(entry.name, entry.is_dir(follow_symlinks=False)) for entry in entries]
+                for child, child_is_dir in children:
+                    hoisted += 1
+                    hoisted_name = _HOISTED_PREFIX + str(hoisted)
+                    try:
+                        os.rename(child, hoisted_name, src_dir_fd=dir_fd, dst_dir_fd=root_fd)
+                    except PermissionError:
+                        # Both directories need write permission, moved one for its '..' entry
+                        os.fchmod(dir_fd, stat.S_IRWXU)
+                        if child_is_dir:
+                            os.chmod(child, stat.S_IRWXU, dir_fd=dir_fd)
+                        os.rename(child, hoisted_name, src_dir_fd=dir_fd, dst_dir_fd=root_fd)
+                    pending.append((hoisted_name, child_is_dir))
+            finally:
+                os.close(dir_fd)
+            os.rmdir(name, dir_fd=root_fd)
+    finally:
+        os.close(root_fd)
+
+    os.rmdir(os.fspath(root))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+'''
+Pool of reusable working directories with background removal
+
+Checks take clean directories created in advance and give them back when
+finished. Used directory is moved aside by single atomic rename into trash
+directory, its tree is removed by background thread (using scandir based
+mkdir_verify.remove_tree()) which also refills the pool:
+
+    pool = mkdir_workdir.WorkdirPool(root, size=4)
+    path = pool.acquire()
+    mkdir_runner.mkdir('-p', 'a/b/c', _cwd=path)
+    pool.release(path)
+    pool.close()
+
+Both pool and trash are bounded, release() waits while backlog of trees
+waiting for removal is full. Directories of failed checks can be kept for
+inspection, close() removes everything else including the root.
+'''
+
+import itertools
+import os
+import queue
+import threading
+from typing import List, Tuple
+
+import mkdir_verify
+
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_BACKLOG = 16
+
+# Prefix of pool root directories created by pytest_mkdir_workdir plugin
+POOL_DIR_PREFIX = 'workdirs'
+
+# Subdirectory of pool root with directories kept for inspection
+KEPT_DIR = 'kept'
+
+
+class WorkdirPool:
+    '''
+    Pool of clean directories under root
+
+    size: number of clean directories prepared in advance
+    backlog: max number of used trees waiting for removal
+    errors: (path, exception) of trees the background thread failed to remove
+        or clean directories it failed to create
+    '''
+
+    def __init__(self, root, size: int = DEFAULT_POOL_SIZE, backlog: int = DEFAULT_BACKLOG):
+        self.root = os.fspath(root)
+        self.size = size
+        self.errors: List[Tuple[str, OSError]] = []
+        self._clean_root = os.path.join(self.root, 'clean')
+        self._trash_root = os.path.join(self.root, 'trash')
+        self._kept_root = os.path.join(self.root, KEPT_DIR)
+        os.mkdir(self._clean_root)
+        os.mkdir(self._trash_root)
+
+        self._names = itertools.count()
+        self._clean: queue.Queue = queue.Queue()
+        self._trash: queue.Queue = queue.Queue(maxsize=max(backlog, 1))
+        for _ in range(size):
+            self._clean.put(self._create())
+
+        self._thread = threading.Thread(target=self._remove_trash, name='workdir-pool',
+                                        daemon=True)
+        self._thread.start()
+
+    def _create(self) -> str:
+        path = os.path.join(self._clean_root, str(next(self._names)))
+        os.mkdir(path)
+        return path
+
+    def acquire(self) -> str:
+        '''
+        Path of clean directory, created on demand when the pool is drained
+        '''
+        try:
+            return self._clean.get_nowait()
+        except queue.Empty:
+            return self._create()
+
+    def release(self, path):
+        '''
+        Move used directory to trash for background removal
+        '''
+        trash_path = os.path.join(self._trash_root, os.path.basename(os.fspath(path)))
+        os.rename(os.fspath(path), trash_path)
+        self._trash.put(trash_path)
+
+    def keep(self, path) -> str:
+        '''
+        Move used directory out of the pool, it is not removed by close()
+        '''
+        os.makedirs(self._kept_root, exist_ok=True)
+        kept_path = os.path.join(self._kept_root, os.path.basename(os.fspath(path)))
+        os.rename(os.fspath(path), kept_path)
+        return kept_path
+
+    def _remove_trash(self):
+        while True:
+            path = self._trash.get()
+            if path is None:
+                return
+            try:
+                mkdir_verify.remove_tree(path)
+            except OSError as exc:
+                self.errors.append((path, exc))
+            # Thread must survive e.g. ENOSPC, release() waits for it
+            if self._clean.qsize() < self.size:
+                try:
+                    self._clean.put(self._create())
+                except OSError as exc:
+                    self.errors.append((exc.filename, exc))
+
+    def close(self):
+        '''
+        Wait for removal of released trees, remove pool and trash directories,
+        failures are added to errors
+        '''
+        self._trash.put(None)
+        self._thread.join()
+
+        for path in (self._clean_root, self._trash_root):
+            try:
+                mkdir_verify.remove_tree(path)
+            except OSError as exc:
+                self.errors.append((path, exc))
+        if not os.listdir(self.root):
+            os.rmdir(self.root)
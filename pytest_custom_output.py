@@ -9,6 +9,28 @@ Configures test result output in following format:
         and print on stdout: "/**TEST FAILED: <number of failed checks, summary>**/"
       - If all check passed it should exit returning 0 and print on
         stdout: "/**TEST PASSED: <summary>**/"
+
+When run distributed by pytest-xdist, reports of all workers are aggregated
+on the controller which prints the only final summary. Using '--ordered-output'
+CLI option check result lines are printed in collection order instead of
+order of completion.
+
+Optional timing information:
+      - '--show-durations': append duration of the check to every result line
+      - '--slowest=N': print N slowest checks before final summary
+      - '--report-jsonl=PATH': write machine-readable record of every check
+        (node id, outcome, duration, phase timings, failure message, printed
+        result lines and counted categories) to file
+
+Resource usage of child processes (CPU time, max RSS, context switches,
+block I/O) is measured for every test phase and attached to its report as
+'rusage' dict, '--show-rusage' CLI option prints it aggregated per test class.
+Spawn-to-exit latency of every mkdir invocation is counted in constant memory
+histograms, '--show-latency' CLI option prints p50/p90/p99/max per test module.
+
+For very large runs '--stream-output' CLI option keeps only counters and
+a bounded sample of failure reports in memory, and output is flushed only
+after given time ('--flush-interval') or amount of buffered output.
 '''
 
 # Portions of code adopted from:
@@ -17,11 +39,19 @@ Configures test result output in following format:
 
 
 from __future__ import print_function
+import collections
+import heapq
+import json
 import sys
+import threading
 import time
 import re
 
 import pytest
+
+import mkdir_histogram
+import mkdir_runner
+
 try:
     from pytest import ExitCode
 except ImportError:
@@ -38,9 +68,97 @@ except ImportError:
 
 __version__ = '0.1.0'
 
+# Extracts failure explanation from crash message of failed assertion
+_MESSAGE_RE = re.compile("[AssertionError|Failed]: (.*)$", re.MULTILINE)
+
+# Output buffered in streaming mode is flushed after this many characters
+STREAM_FLUSH_SIZE = 64 * 1024
+
+# Measures child process usage of test phases in the process running tests
+_usage_meter = None
+
+# Latencies of invocations finished during current test phase
+_phase_latency = mkdir_histogram.Histogram()
+_latency_lock = threading.Lock()
+
+# Percentiles printed by '--show-latency'
+LATENCY_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+def crash_message(report, default=''):
+    '''
+    Failure explanation of the report, whole crash message if not an assertion
+    '''
+    reprcrash = getattr(report.longrepr, 'reprcrash', None)
+    message = getattr(reprcrash, 'message', default)
+    match = _MESSAGE_RE.search(message)
+    return match.group(1) if match else message
+
+
+def format_summary(counts, n_tests):
+    '''
+    Final summary line from counts of reports per category (keys as in
+    CustomReporter.stats) and number of run tests
+    '''
+    problems = []
+    if counts.get('E'):
+        problems.append('errors={}'.format(counts['E']))
+    if counts.get('F'):
+        problems.append('failures={}'.format(counts['F']))
+    if counts.get('s'):
+        problems.append('skipped={}'.format(counts['s']))
+    if counts.get('x'):
+        problems.append('expected failures={}'.format(counts['x']))
+    if counts.get('u'):
+        problems.append('unexpected successes={}'.format(counts['u']))
+
+    total_fails = counts.get('F', 0) + counts.get('E', 0) + counts.get('u', 0)
+    if total_fails:
+        return "/** TEST FAILED: {} ({}), total {} **/".format(
+            total_fails, ", ".join(problems), n_tests)
+    elif problems:
+        return "/** TEST PASSED: {} ({}) **/".format(n_tests, ", ".join(problems))
+    return "/** TEST PASSED: {} **/".format(n_tests)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('custom_output', 'custom result output')
+    group.addoption('--ordered-output', action='store_true', dest='ordered_output', default=False,
+                    help="print check results in collection order when distributed by pytest-xdist")
+    group.addoption('--show-durations', action='store_true', dest='show_durations', default=False,
+                    help="append duration of the check to every result line")
+    group.addoption('--slowest', action='store', dest='slowest', type=int, default=0, metavar='N',
+                    help="print N slowest checks before final summary")
+    group.addoption('--report-jsonl', action='store', dest='report_jsonl', default=None,
+                    metavar='PATH', help="write JSON record of every check to file, one per line")
+    group.addoption('--stream-output', action='store_true', dest='stream_output', default=False,
+                    help="constant memory mode, keep only counters and sample of failures, "
+                         "buffer output")
+    group.addoption('--failure-sample', action='store', dest='failure_sample', type=int,
+                    default=20, metavar='N',
+                    help="number of failure and error reports kept in streaming mode "
+                         "(default: %(default)s)")
+    group.addoption('--flush-interval', action='store', dest='flush_interval', type=float,
+                    default=1.0, metavar='SECONDS',
+                    help="max age of buffered output in streaming mode (default: %(default)s)")
+    group.addoption('--show-rusage', action='store_true', dest='show_rusage', default=False,
+                    help="print resource usage of child processes aggregated per test class")
+    group.addoption('--show-latency', action='store_true', dest='show_latency', default=False,
+                    help="print mkdir invocation latency percentiles per test module")
+
 
 @pytest.hookimpl(trylast=True)
 def pytest_configure(config):
+    global _usage_meter
+    _usage_meter = mkdir_runner.UsageMeter()
+    mkdir_runner.observers.append(_record_latency)
+
+    if hasattr(config, 'workerinput'):
+        # pytest-xdist worker, reports are relayed to and printed by controller,
+        # only make sure they carry tracebacks parsable by controller reporter
+        config.option.tbstyle = 'native'
+        return
+
     if getattr(config.option, 'cricket_mode', 'off') == 'off':
         # Unregister the default terminal reporter.
         config.pluginmanager.unregister(name="terminalreporter")
@@ -52,14 +170,56 @@ def pytest_configure(config):
         config.option.tbstyle = 'native'
 
 
+def pytest_unconfigure(config):
+    if _usage_meter is not None:
+        _usage_meter.close()
+    if _record_latency in mkdir_runner.observers:
+        mkdir_runner.observers.remove(_record_latency)
+
+
+def _record_latency(result):
+    # Invocations may finish in several threads at once
+    with _latency_lock:
+        _phase_latency.record(result.elapsed)
+
+
+def _take_phase_latency():
+    global _phase_latency
+    with _latency_lock:
+        histogram = _phase_latency
+        _phase_latency = mkdir_histogram.Histogram()
+    return histogram
+
+
+def pytest_runtest_logstart(nodeid, location):
+    # Usage and latencies of the item start with its setup
+    if _usage_meter is not None:
+        _usage_meter.lap()
+    _take_phase_latency()
+
+
 @pytest.mark.hookwrapper
 def pytest_runtest_makereport(item, call):
+    usage = _usage_meter.lap() if _usage_meter is not None else None
+    latency = _take_phase_latency()
     outcome = yield
     report = outcome.get_result()
+    # Plain dicts survive serialization of pytest-xdist worker reports
+    if usage is not None:
+        report.rusage = usage._asdict()
+    if latency.count:
+        report.latency = latency.to_dict()
     node = getattr(item, 'obj', None)
     if node and item.obj.__doc__:
         report.docstring_summary = str(
             item.obj.__doc__).lstrip().split("\n")[0].strip()
+        # Parametrized tests may refer to their parameters as {name}
+        callspec = getattr(item, 'callspec', None)
+        if callspec is not None and '{' in report.docstring_summary:
+            try:
+                report.docstring_summary = report.docstring_summary.format(**callspec.params)
+            except (KeyError, IndexError, ValueError):
+                pass
 
 
 class CustomReporter:
@@ -73,6 +233,40 @@ class CustomReporter:
         self.hasmarkup = False
 
         self.stats = {}
+        self.counts = collections.Counter()
+
+        # Streaming mode keeps in self.stats only sample of failures and errors
+        self.streaming = getattr(self.config.option, 'stream_output', False)
+        self.failure_sample = getattr(self.config.option, 'failure_sample', 20)
+        self.flush_interval = getattr(self.config.option, 'flush_interval', 1.0)
+        self._last_flush = time.monotonic()
+        self._buffered = 0
+
+        # Collection order of node ids used for ordered output of
+        # distributed runs, None until workers report collected items
+        self.ordered = getattr(self.config.option, 'ordered_output', False)
+        self._order = None
+        self._order_ids = []
+        self._pending = {}
+        self._finished = set()
+        self._next_index = 0
+
+        self.show_durations = getattr(self.config.option, 'show_durations', False)
+        self.slowest = getattr(self.config.option, 'slowest', 0)
+        self.report_jsonl = getattr(self.config.option, 'report_jsonl', None)
+        self._jsonl_file = None
+        # Records of items in progress, completed on teardown report
+        self._records = {}
+        # Bounded min-heap of (duration, nodeid, description) of slowest checks
+        self._slowest = []
+
+        self.show_rusage = getattr(self.config.option, 'show_rusage', False)
+        # Child process usage aggregated per test class (or module)
+        self._class_usage = {}
+
+        self.show_latency = getattr(self.config.option, 'show_latency', False)
+        # Histograms of mkdir invocation latency per test module
+        self._module_latency = {}
 
         # These are needed for compatibility; some plugins
         # rely on the fact that there is a terminalreporter
@@ -129,7 +323,7 @@ class CustomReporter:
         self._tw.write(text)
         self._tw.write(end)
         try:
-            if kwargs.pop('flush', False):
+            if kwargs.pop('flush', False) and self._flush_due(len(text) + len(end)):
                 self._tw.flush()
         except AttributeError:
             # pytest 6 introduced a separate flush argument to
@@ -138,6 +332,39 @@ class CustomReporter:
             # the flush was made implicitly on every write.
             pass
 
+    def _flush_due(self, length):
+        # Streaming mode flushes only when buffer is old or large enough
+        if not self.streaming:
+            return True
+
+        self._buffered += length
+        now = time.monotonic()
+        if self._buffered < STREAM_FLUSH_SIZE and now - self._last_flush < self.flush_interval:
+            return False
+
+        self._buffered = 0
+        self._last_flush = now
+        return True
+
+    @property
+    def n_tests(self) -> int:
+        '''
+        Number of tests run so far (reports of call phase)
+        '''
+        return self._n_tests
+
+    def add_stat(self, key, report):
+        self.counts[key] += 1
+        record = self._records.get(report.nodeid)
+        if record is not None:
+            record['stats'].append(key)
+        if not self.streaming:
+            self.stats.setdefault(key, []).append(report)
+        elif key in ('F', 'E'):
+            sample = self.stats.setdefault(key, [])
+            if len(sample) < self.failure_sample:
+                sample.append(report)
+
     def pytest_internalerror(self, excrepr):
         for line in str(excrepr).split("\n"):
             self.write_line("INTERNALERROR> " + line)
@@ -147,50 +374,118 @@ class CustomReporter:
         self._starttime = time.time()
         self._n_tests = 0
         self._started = False
+        # Distributed run is detected by presence of xdist controller session
+        self.xdist = self.config.pluginmanager.has_plugin('dsession')
+        if self.report_jsonl:
+            self._jsonl_file = open(self.report_jsonl, 'w', encoding='utf-8')
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_xdist_node_collection_finished(self, node, ids):
+        # All workers collect identical items, first complete list defines the order
+        if self._order is None:
+            self._order_ids = list(ids)
+            self._order = {nodeid: index for index, nodeid in enumerate(ids)}
+
+    def emit(self, report, line, outcome, message=''):
+        '''
+        Print check result line, in ordered distributed mode hold it until
+        results of all preceding items are printed
+        '''
+        record = self._records.get(report.nodeid)
+        if record is not None and record['outcome'] in (None, 'passed'):
+            record['outcome'] = outcome
+            record['message'] = message
+
+        if self.show_durations:
+            line = '{} ({:.3f}s)'.format(line, report.duration)
+        if record is not None:
+            record['lines'].append(line)
+
+        if not (self.ordered and self.xdist):
+            self.print(line, flush=True)
+        else:
+            self._pending.setdefault(report.nodeid, []).append(line)
+
+    def _flush_ordered(self):
+        ordered_ids = self._order_ids
+        while self._next_index < len(ordered_ids) \
+                and ordered_ids[self._next_index] in self._finished:
+            for line in self._pending.pop(ordered_ids[self._next_index], []):
+                self.print(line, flush=True)
+            self._next_index += 1
+
+    def _flush_pending(self):
+        # Print whatever remained, e.g. items not known from collection
+        self._flush_ordered()
+        order = self._order or {}
+        for nodeid in sorted(self._pending, key=lambda nodeid: order.get(nodeid, len(order))):
+            for line in self._pending[nodeid]:
+                self.print(line, flush=True)
+        self._pending.clear()
 
     def pytest_runtest_logstart(self, nodeid, location):
         if not self._started:
             self._started = True
 
     def report_pass(self, report):
-        self.stats.setdefault('.', []).append(report)
-        self.print('[PASS] {}'.format(report.docstring_summary), flush=True)
+        self.add_stat('.', report)
+        self.emit(report, '[PASS] {}'.format(report.docstring_summary), 'passed')
 
     def report_fail(self, report):
-        self.stats.setdefault('F', []).append(report)
-        reprcrash = getattr(report.longrepr, 'reprcrash', None)
-        message = getattr(reprcrash, 'message', [''])
-        items = re.findall("[AssertionError|Failed]: (.*)$",
-                           message, re.MULTILINE)
-        self.print('[FAIL] {}, {}'.format(
-            report.docstring_summary, items[0]), flush=True)
+        self.add_stat('F', report)
+        message = crash_message(report)
+        self.emit(report, '[FAIL] {}, {}'.format(report.docstring_summary, message),
+                  'failed', message)
 
     def report_error(self, report):
-        self.stats.setdefault('E', []).append(report)
+        self.add_stat('E', report)
         reprcrash = getattr(report.longrepr, 'reprcrash', None)
         message = getattr(reprcrash, 'message', '')
-        self.print('[ERROR] {}, {}'.format(
-            report.docstring_summary, message), flush=True)
+        self.emit(report, '[ERROR] {}, {}'.format(report.docstring_summary, message),
+                  'error', message)
 
     def report_skip(self, report):
-        self.stats.setdefault('s', []).append(report)
-        self.print('[SKIP] {}'.format(report.docstring_summary), flush=True)
+        self.add_stat('s', report)
+        self.emit(report, '[SKIP] {}'.format(report.docstring_summary), 'skipped')
 
     def report_expected_failure(self, report):
-        self.stats.setdefault('x', []).append(report)
-        reprcrash = getattr(report.longrepr, 'reprcrash', None)
-        message = getattr(reprcrash, 'message', [''])
-        items = re.findall("[AssertionError|Failed]: (.*)$",
-                           message, re.MULTILINE)
-        self.print('[XFAIL] {}, {}'.format(
-            report.docstring_summary, items[0]), flush=True)
+        self.add_stat('x', report)
+        message = crash_message(report)
+        self.emit(report, '[XFAIL] {}, {}'.format(report.docstring_summary, message),
+                  'xfailed', message)
 
     def report_unexpected_success(self, report):
-        self.stats.setdefault('u', []).append(report)
+        self.add_stat('u', report)
         self.print('u', end='', flush=True)
-        self.print('[UPASS] {}'.format(report.docstring_summary), flush=True)
+        self.emit(report, '[UPASS] {}'.format(report.docstring_summary), 'xpassed')
 
     def pytest_runtest_logreport(self, report):
+        record = self._records.setdefault(report.nodeid, {
+            'description': getattr(report, 'docstring_summary', report.nodeid),
+            'outcome': None,
+            'message': '',
+            'phases': {},
+            'rusage': mkdir_runner.Usage(),
+            'lines': [],
+            'stats': [],
+            'properties': dict(report.user_properties),
+        })
+        record['phases'][report.when] = report.duration
+
+        rusage = getattr(report, 'rusage', None)
+        if rusage is not None:
+            usage = mkdir_runner.Usage(**rusage)
+            record['rusage'] = record['rusage'].combine(usage)
+            class_id = report.nodeid.rsplit('::', 1)[0]
+            self._class_usage[class_id] = self._class_usage.get(
+                class_id, mkdir_runner.Usage()).combine(usage)
+
+        latency = getattr(report, 'latency', None)
+        if latency is not None:
+            module_id = report.nodeid.split('::', 1)[0]
+            self._module_latency.setdefault(module_id, mkdir_histogram.Histogram()).merge(
+                mkdir_histogram.Histogram.from_dict(latency))
+
         if report.when == 'call':
             self._n_tests += 1
 
@@ -232,12 +527,89 @@ class CustomReporter:
                 else:
                     self.report_expected_failure(report)
 
+            if report.when == 'teardown' and self.ordered and self.xdist:
+                self._finished.add(report.nodeid)
+                self._flush_ordered()
+
+        if report.when == 'teardown':
+            self.finish_record(report.nodeid)
+
+    def finish_record(self, nodeid):
+        '''
+        Item completed, account its total duration and write its JSON record
+        '''
+        record = self._records.pop(nodeid, None)
+        if record is None:
+            return
+
+        duration = sum(record['phases'].values())
+
+        if self.slowest > 0:
+            entry = (duration, nodeid, record['description'])
+            if len(self._slowest) < self.slowest:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heappushpop(self._slowest, entry)
+
+        if self._jsonl_file is not None:
+            self._jsonl_file.write(json.dumps({
+                'nodeid': nodeid,
+                'description': record['description'],
+                'outcome': record['outcome'] or 'passed',
+                'duration': duration,
+                'phases': record['phases'],
+                'message': record['message'],
+                'rusage': record['rusage']._asdict(),
+                'lines': record['lines'],
+                'stats': record['stats'],
+                'properties': record['properties'],
+            }, default=str) + "\n")
+
+    def print_slowest(self):
+        if not self._slowest:
+            return
+
+        self.print()
+        self.print("Slowest {} checks:".format(len(self._slowest)))
+        for duration, nodeid, description in sorted(self._slowest, reverse=True):
+            self.print("  {:.3f}s  {} [{}]".format(duration, description, nodeid))
+
+    def print_rusage(self):
+        if not (self.show_rusage and self._class_usage):
+            return
+
+        self.print()
+        self.print("Child process usage per class (user/sys CPU, max RSS, "
+                   "voluntary/involuntary context switches, block input/output):")
+        for class_id, usage in sorted(self._class_usage.items()):
+            self.print("  {:8.3f}s {:8.3f}s {:8d} kB {:>13} {:>13}  {}".format(
+                usage.user, usage.system, usage.maxrss,
+                "{}/{}".format(usage.nvcsw, usage.nivcsw),
+                "{}/{}".format(usage.inblock, usage.oublock), class_id))
+
+    def print_latency(self):
+        if not (self.show_latency and self._module_latency):
+            return
+
+        total = mkdir_histogram.Histogram()
+        self.print()
+        self.print("mkdir invocation latency per module ({}/max):".format(
+            "/".join("p{:g}".format(100 * fraction) for fraction in LATENCY_PERCENTILES)))
+        for module_id, histogram in sorted(self._module_latency.items()):
+            total.merge(histogram)
+            self.print(self._format_latency(histogram, module_id))
+        self.print(self._format_latency(total, "all modules"))
+
+    @staticmethod
+    def _format_latency(histogram, name):
+        values = [histogram.percentile(fraction) for fraction in LATENCY_PERCENTILES]
+        values.append(histogram.max)
+        return "  {:8d} calls  {}  {}".format(
+            histogram.count, "  ".join("{:9.3f} ms".format(1000 * value) for value in values), name)
+
     def pytest_sessionfinish(self, exitstatus):
-        errors = self.stats.get('E', [])
-        failures = self.stats.get('F', [])
-        upasses = self.stats.get('u', [])
-        xfails = self.stats.get('x', [])
-        skips = self.stats.get('s', [])
+        if self.ordered and self.xdist:
+            self._flush_pending()
 
         if exitstatus in {ExitCode.OK, ExitCode.TESTS_FAILED}:
             self.config.hook.pytest_terminal_summary(
@@ -246,29 +618,22 @@ class CustomReporter:
                 exitstatus=exitstatus,
             )
 
-        problems = []
-        if errors:
-            problems.append('errors={}'.format(len(errors)))
-        if failures:
-            problems.append('failures={}'.format(len(failures)))
-        if skips:
-            problems.append('skipped={}'.format(len(skips)))
-        if xfails:
-            problems.append('expected failures={}'.format(len(xfails)))
-        if upasses:
-            problems.append('unexpected successes={}'.format(len(upasses)))
+        self.print_slowest()
+        self.print_rusage()
+        self.print_latency()
+        if self._jsonl_file is not None:
+            self._jsonl_file.close()
+            self._jsonl_file = None
 
         if self._n_tests:
             self.print()
-            if failures or errors or upasses:
-                total_fails = len(failures) + len(errors) + len(upasses)
-                self.print("/** TEST FAILED: {} ({}), total {} **/".format(
-                    total_fails, ", ".join(problems), self._n_tests))
-            elif skips or xfails:
-                self.print(
-                    "/** TEST PASSED: {} ({}) **/".format(self._n_tests, ", ".join(problems)))
-            else:
-                self.print("/** TEST PASSED: {} **/".format(self._n_tests))
+            self.print(format_summary(self.counts, self._n_tests))
+
+        try:
+            self._tw.flush()
+        except AttributeError:
+            # pytest <6, output was flushed implicitly on every write
+            pass
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+'''
+pytest benchmark marker plugin
+
+Tests marked with @pytest.mark.benchmark are deselected unless pytest is run
+with '--benchmark' CLI option. Benchmark tests record their results using
+'bench_table' fixture, recorded tables are printed before final test summary
+and optionally written to file given by '--benchmark-output' CLI option.
+'''
+
+from typing import List, Sequence
+
+import pytest
+
+
+class BenchTable:
+    '''
+    Plain text table of benchmark results
+    '''
+
+    def __init__(self, title: str, columns: Sequence[str]):
+        self.title = title
+        self.columns = list(columns)
+        self.rows: List[List[str]] = []
+
+    def add_row(self, *values):
+        self.rows.append([_format_value(value) for value in values])
+
+    def lines(self) -> List[str]:
+        widths = [max(len(row[col]) for row in [self.columns] + self.rows)
+                  for col in range(len(self.columns))]
+
+        def format_row(row):
+            return "  ".join(value.rjust(width) for value, width in zip(row, widths))
+
+        return [self.title, format_row(self.columns), "  ".join("-" * width for width in widths)] \
+            + [format_row(row) for row in self.rows]
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return "{:.3f}".format(value)
+    return str(value)
+
+
+_tables: List[BenchTable] = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark', 'mkdir benchmarks')
+    group.addoption('--benchmark', action='store_true', dest='benchmark', default=False,
+                    help="run tests marked as benchmark")
+    group.addoption('--benchmark-output', action='store', dest='benchmark_output',
+                    metavar='PATH', default=None,
+                    help="write benchmark result tables also to given file")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('benchmark'):
+        return
+
+    selected = []
+    deselected = []
+    for item in items:
+        if 'benchmark' in item.keywords:
+            deselected.append(item)
+        else:
+            selected.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+@pytest.fixture
+def bench_table():
+    '''
+    Factory fixture creating recorded benchmark result table: bench_table(title, columns)
+    '''
+    def factory(title, columns):
+        table = BenchTable(title, columns)
+        _tables.append(table)
+        return table
+
+    return factory
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _tables:
+        return
+
+    lines = []
+    for table in _tables:
+        lines.append('')
+        lines.extend(table.lines())
+
+    for line in lines:
+        terminalreporter.line(line)
+
+    output = config.getoption('benchmark_output')
+    if output:
+        with open(output, 'w', encoding='utf-8') as out_file:
+            out_file.write("\n".join(lines).lstrip("\n") + "\n")
+
+
+if __name__ == "__main__":
+    print("""pytest_mark_benchmark.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mark_benchmark")
+
+Also please remember to add custom 'benchmark' marker definition to pytest.ini:
+
+[pytest]
+markers =
+    benchmark: Marks performance benchmark, deselected unless run with --benchmark
+
+    """)
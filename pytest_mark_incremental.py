@@ -1,17 +1,141 @@
 #!/usr/bin/env python3
 '''
 pytest incremental testing setup plugin
+
+Failures of incremental tests are shared by all processes taking part in
+the test run. When distributed by pytest-xdist the controller hands its
+workers a common failure store file, '--incremental-store' CLI option sets
+its path (e.g. to inspect failures after the run). The store holds failures
+of a single run only, the file is emptied when the session starts so steps
+are not skipped because of failures of a previous run.
 '''
 
 # Adopted from
 # https://docs.pytest.org/en/latest/example/simple.html#incremental-testing-test-steps
 
+import fcntl
+import json
+import os
+import tempfile
+
 import pytest
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+
+
+class IncrementalStore:
+    '''
+    History of failures per test class name and per index in parametrize
+    (if parametrize used)
+
+    Failures are kept in memory and, when path is given, also appended to
+    a file shared by other processes. Access to the file is guarded by flock.
+    '''
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._failed: Dict[str, Dict[Tuple[int, ...], str]] = {}
+        self._offset = 0
+
+    def record(self, cls_name: str, parametrize_index: Tuple[int, ...], test_name: str):
+        self._failed.setdefault(cls_name, {}).setdefault(parametrize_index, test_name)
+
+        if self.path is not None:
+            line = json.dumps([cls_name, list(parametrize_index), test_name]) + "\n"
+            with open(self.path, 'a', encoding='utf-8') as store_file:
+                fcntl.flock(store_file, fcntl.LOCK_EX)
+                try:
+                    store_file.write(line)
+                finally:
+                    fcntl.flock(store_file, fcntl.LOCK_UN)
+
+    def get(self, cls_name: str, parametrize_index: Tuple[int, ...]) -> Optional[str]:
+        '''
+        Name of the first test which failed for class and index, failure of
+        a non-parametrized test applies to all indexes of its class
+        '''
+        self._refresh()
+        failed = self._failed.get(cls_name, {})
+        return failed.get(parametrize_index, failed.get(()))
+
+    def forget(self, cls_name: str):
+        '''
+        Drop failures of class recorded so far, e.g. before it is run again
+        '''
+        self._refresh()
+        self._failed.pop(cls_name, None)
+
+    def _refresh(self):
+        # Read only lines appended by other processes since last refresh
+        if self.path is None or not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) == self._offset:
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as store_file:
+            fcntl.flock(store_file, fcntl.LOCK_SH)
+            try:
+                store_file.seek(self._offset)
+                lines = store_file.readlines()
+                self._offset = store_file.tell()
+            finally:
+                fcntl.flock(store_file, fcntl.LOCK_UN)
+
+        for line in lines:
+            cls_name, parametrize_index, test_name = json.loads(line)
+            self._failed.setdefault(cls_name, {}).setdefault(tuple(parametrize_index), test_name)
+
+
+_test_failed_incremental = IncrementalStore()
+
+# Store file created by this process for its xdist workers, removed at exit
+_created_store_path: Optional[str] = None
+
+
+def forget_failures(cls_name: str):
+    '''
+    Let incremental tests of class run again after they have failed
+    '''
+    _test_failed_incremental.forget(cls_name)
 
-# store history of failures per test class name and per index in parametrize
-# (if parametrize used)
-_test_failed_incremental: Dict[str, Dict[Tuple[int, ...], str]] = {}
+
+def pytest_addoption(parser):
+    group = parser.getgroup('incremental', 'incremental testing')
+    group.addoption('--incremental-store', action='store', dest='incremental_store',
+                    metavar='PATH', default=None,
+                    help="file shared by all processes of the test run to record "
+                         "failures of incremental tests, emptied at session start")
+
+
+def pytest_configure(config):
+    workerinput = getattr(config, 'workerinput', None)
+    if workerinput is not None:
+        _test_failed_incremental.path = workerinput.get('incremental_store')
+        return
+
+    _test_failed_incremental.path = config.getoption('incremental_store')
+    if _test_failed_incremental.path is not None:
+        # Controller (or single process) starts the run with empty store
+        open(_test_failed_incremental.path, 'w').close()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # pytest-xdist controller: hand every worker the same store file
+    global _created_store_path
+
+    if _test_failed_incremental.path is None:
+        fd, _created_store_path = tempfile.mkstemp(prefix='pytest-incremental-', suffix='.jsonl')
+        os.close(fd)
+        _test_failed_incremental.path = _created_store_path
+    node.workerinput['incremental_store'] = _test_failed_incremental.path
+
+
+def pytest_unconfigure(config):
+    global _created_store_path
+
+    if _created_store_path is not None:
+        os.remove(_created_store_path)
+        _created_store_path = None
 
 
 def pytest_runtest_makereport(item, call):
@@ -30,32 +154,29 @@ def pytest_runtest_makereport(item, call):
             )
             # retrieve the name of the test function
             test_name = item.originalname or item.name
-            # store in _test_failed_incremental the original name of the failed test
-            _test_failed_incremental.setdefault(cls_name, {}).setdefault(
-                parametrize_index, test_name
-            )
+            # store the original name of the failed test
+            _test_failed_incremental.record(cls_name, parametrize_index, test_name)
 
 
+@pytest.hookimpl(tryfirst=True)
 def pytest_runtest_setup(item):
+    # Runs before fixtures of the item (including class scoped ones) are set up
     if "incremental" in item.keywords:
         # retrieve the class name of the test
         cls_name = str(item.cls)
-        # check if a previous test has failed for this class
-        if cls_name in _test_failed_incremental:
-            # retrieve the index of the test (if parametrize is used
-            # in combination with incremental)
-            parametrize_index = (
-                tuple(item.callspec.indices.values())
-                if hasattr(item, "callspec")
-                else ()
-            )
-            # retrieve the name of the first test function to fail for
-            # this class name and index
-            test_name = _test_failed_incremental[cls_name].get(
-                parametrize_index, None)
-            # if name found, test has failed for the combination of class name & test name
-            if test_name is not None:
-                pytest.xfail("previous test failed ({})".format(test_name))
+        # retrieve the index of the test (if parametrize is used
+        # in combination with incremental)
+        parametrize_index = (
+            tuple(item.callspec.indices.values())
+            if hasattr(item, "callspec")
+            else ()
+        )
+        # retrieve the name of the first test function to fail for
+        # this class name and index
+        test_name = _test_failed_incremental.get(cls_name, parametrize_index)
+        # if name found, test has failed for the combination of class name & test name
+        if test_name is not None:
+            pytest.xfail("previous test failed ({})".format(test_name))
 
 
 if __name__ == "__main__":
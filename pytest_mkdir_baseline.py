@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+'''
+pytest timing baseline plugin
+
+Using '--baseline-db=PATH' CLI option timings of every run are stored in
+SQLite database, keyed by mkdir binary path, its version (first line of
+'mkdir --version') and host name:
+      - per check: total duration of setup, call and teardown
+      - per invocation: number and median latency of mkdir invocations
+        made by the check
+
+Before storing, every check is compared with its baseline, i.e. timings from
+last '--baseline-runs' runs on the same host using the same binary path. Checks
+whose median duration grew by more than '--regression-threshold' percent are
+flagged before final test summary:
+
+    [SLOWER] <description of check>, median 0.012s, baseline 0.008s (+50%) ...
+'''
+
+import os
+import socket
+import sqlite3
+import statistics
+import time
+
+import mkdir_histogram
+import mkdir_runner
+
+
+# Slowdowns smaller than this many seconds are noise, never flagged
+MIN_REGRESSION_DELTA = 0.005
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    binary TEXT NOT NULL,
+    version TEXT NOT NULL,
+    host TEXT NOT NULL,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checks (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    nodeid TEXT NOT NULL,
+    duration REAL NOT NULL,
+    invocations INTEGER NOT NULL,
+    latency_median REAL
+);
+CREATE INDEX IF NOT EXISTS checks_nodeid ON checks(nodeid, run_id);
+CREATE INDEX IF NOT EXISTS runs_key ON runs(host, binary, id);
+"""
+
+
+class BaselineStore:
+    '''
+    SQLite database of check timings of past runs
+    '''
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(os.fspath(path))
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def baseline(self, binary: str, host: str, runs: int):
+        '''
+        Durations and versions of checks from last runs on host using binary
+
+        Returns dict nodeid -> (list of durations, set of versions)
+        '''
+        baseline = {}
+        rows = self.connection.execute(
+            "SELECT checks.nodeid, checks.duration, recent.version FROM checks JOIN ("
+            "  SELECT id, version FROM runs WHERE host = ? AND binary = ? ORDER BY id DESC LIMIT ?"
+            ") AS recent ON checks.run_id = recent.id", (host, binary, runs))
+        for nodeid, duration, version in rows:
+            durations, versions = baseline.setdefault(nodeid, ([], set()))
+            durations.append(duration)
+            versions.add(version)
+        return baseline
+
+    def store(self, binary: str, version: str, host: str, started: float, checks):
+        '''
+        Store run with rows (nodeid, duration, invocations, latency median) of its checks
+        '''
+        with self.connection:
+            run_id = self.connection.execute(
+                "INSERT INTO runs (binary, version, host, started) VALUES (?, ?, ?, ?)",
+                (binary, version, host, started)).lastrowid
+            self.connection.executemany(
+                "INSERT INTO checks (run_id, nodeid, duration, invocations, latency_median) "
+                "VALUES (?, ?, ?, ?, ?)", ((run_id,) + tuple(check) for check in checks))
+
+
+class CheckTimings:
+    '''
+    Timings of single check, possibly run several times (e.g. in soak mode)
+    '''
+
+    def __init__(self, description: str):
+        self.description = description
+        self.durations = []
+        self.current = 0.0
+        self.latency = mkdir_histogram.Histogram()
+
+
+def mkdir_version() -> str:
+    '''
+    First line of 'mkdir --version' output, empty if it can't be obtained
+    '''
+    try:
+        result = mkdir_runner.mkdir('--version')
+    except (mkdir_runner.ErrorReturnCode, OSError):
+        return ''
+    return result.stdout.decode(errors='replace').partition('\n')[0].strip()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_baseline', 'timing baseline')
+    group.addoption('--baseline-db', action='store', dest='baseline_db', default=None,
+                    metavar='PATH', help="store timings in SQLite database and compare with baseline")
+    group.addoption('--baseline-runs', action='store', dest='baseline_runs', type=int,
+                    default=5, metavar='N',
+                    help="number of last stored runs forming the baseline (default: %(default)s)")
+    group.addoption('--regression-threshold', action='store', dest='regression_threshold',
+                    type=float, default=20.0, metavar='PERCENT',
+                    help="flag checks with median duration slower than baseline by more "
+                         "than PERCENT (default: %(default)s)")
+
+
+def pytest_configure(config):
+    # Only the process printing results records them, reports of
+    # pytest-xdist workers are relayed to it
+    if config.getoption('baseline_db') and not hasattr(config, 'workerinput'):
+        config.pluginmanager.register(BaselineRecorder(config), 'mkdir_baseline_recorder')
+
+
+class BaselineRecorder:
+    '''
+    Collects timings of checks, compares them with baseline and stores them
+    '''
+
+    def __init__(self, config):
+        self.config = config
+        self.started = time.time()
+        self.timings = {}
+
+    def pytest_runtest_logreport(self, report):
+        check = self.timings.get(report.nodeid)
+        if check is None:
+            check = self.timings[report.nodeid] = CheckTimings(
+                getattr(report, 'docstring_summary', report.nodeid))
+
+        check.current += report.duration
+        latency = getattr(report, 'latency', None)
+        if latency is not None:
+            check.latency.merge(mkdir_histogram.Histogram.from_dict(latency))
+        if report.when == 'teardown':
+            check.durations.append(check.current)
+            check.current = 0.0
+
+    def pytest_terminal_summary(self, terminalreporter):
+        timings = {nodeid: check for nodeid, check in self.timings.items() if check.durations}
+        if not timings:
+            return
+
+        binary = mkdir_runner.mkdir._path
+        version = mkdir_version()
+        host = socket.gethostname()
+        threshold = self.config.getoption('regression_threshold')
+
+        store = BaselineStore(self.config.getoption('baseline_db'))
+        try:
+            baseline = store.baseline(binary, host, self.config.getoption('baseline_runs'))
+
+            flagged = []
+            for nodeid, check in timings.items():
+                if nodeid not in baseline:
+                    continue
+                durations, versions = baseline[nodeid]
+                median = statistics.median(check.durations)
+                baseline_median = statistics.median(durations)
+                if median - baseline_median > max(baseline_median * threshold / 100,
+                                                   MIN_REGRESSION_DELTA):
+                    flagged.append((median / baseline_median if baseline_median else float('inf'),
+                                    check.description, median, baseline_median, versions))
+
+            if baseline:
+                terminalreporter.line("")
+                terminalreporter.line("Timing baseline: {} checks compared, {} slower by more "
+                                      "than {:g} %".format(len(set(baseline) & set(timings)),
+                                                           len(flagged), threshold))
+            flagged.sort(key=lambda flag: flag[0], reverse=True)
+            for ratio, description, median, baseline_median, versions in flagged:
+                terminalreporter.line(
+                    "[SLOWER] {}, median {:.3f}s, baseline {:.3f}s ({:+.0f}%), "
+                    "baseline version: {}, current version: {}".format(
+                        description, median, baseline_median, 100 * (ratio - 1),
+                        ", ".join(sorted(versions)), version))
+
+            store.store(binary, version, host, self.started, (
+                (nodeid, statistics.median(check.durations), check.latency.count,
+                 check.latency.percentile(0.5) if check.latency.count else None)
+                for nodeid, check in timings.items()))
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_baseline.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_baseline")
+
+    """)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+'''
+pytest mode matrix selection plugin
+
+Selects extent of '-m/--mode' x umask conformance matrix using
+'--mode-matrix' CLI option:
+      - "--mode-matrix=diagonal": every octal mode is run under one umask,
+        umasks take turns (default)
+      - "--mode-matrix=full": every octal mode is run under every umask
+Symbolic modes are always run under every umask.
+'''
+
+import mkdir_modes
+
+
+MODE_MATRICES = ('diagonal', 'full')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_modes', 'mode matrix')
+    group.addoption('--mode-matrix', action='store', dest='mode_matrix', choices=MODE_MATRICES,
+                    default=MODE_MATRICES[0],
+                    help="octal modes x umasks combinations to check (default: %(default)s)")
+
+
+def mode_umask_pairs(config):
+    '''
+    List of (mode argument, umask) pairs selected by CLI option
+    '''
+    full = config.getoption('mode_matrix') == 'full'
+    pairs = []
+    for index, mode in enumerate(mkdir_modes.octal_modes()):
+        if full:
+            pairs.extend((mode, umask) for umask in mkdir_modes.UMASKS)
+        else:
+            pairs.append((mode, mkdir_modes.UMASKS[index % len(mkdir_modes.UMASKS)]))
+    for mode in mkdir_modes.SYMBOLIC_MODES:
+        pairs.extend((mode, umask) for umask in mkdir_modes.UMASKS)
+    return pairs
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_modes.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_modes")
+
+    """)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+'''
+pytest random name seed plugin
+
+Reseeds mkdir_names generator before every test body from a run seed
+combined with the test node id, and before every fixture from the run seed
+combined with node id of the fixture's scope (e.g. class) and fixture name,
+so names generated by any single test or fixture can be replayed using
+'--name-seed' CLI option, regardless of which tests are selected or how
+they are distributed among xdist workers. Run seed is random unless given,
+when any check fails it is printed before final test summary.
+
+Also selects corpus file of candidate names using '--name-corpus' CLI option,
+shipped docs/UTF-8-test.txt is used by default.
+'''
+
+import random
+
+import pytest
+
+import mkdir_corpus
+import mkdir_names
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_names', 'random directory names')
+    group.addoption('--name-seed', action='store', dest='name_seed', type=int, default=None,
+                    metavar='SEED', help="seed of random directory name generator")
+    group.addoption('--name-corpus', action='store', dest='name_corpus',
+                    default=mkdir_corpus.DEFAULT_CORPUS, metavar='PATH',
+                    help="corpus file of candidate directory names (default: %(default)s)")
+
+
+def pytest_configure(config):
+    if config.getoption('name_seed') is None:
+        config.option.name_seed = random.SystemRandom().randrange(2 ** 32)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    # request.node is the node of fixture's scope, class scoped fixture gets
+    # the same seed whichever of its tests sets it up
+    mkdir_names.seed("{}:{}::{}".format(request.config.getoption('name_seed'),
+                                        request.node.nodeid, fixturedef.argname))
+    yield
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_call(item):
+    mkdir_names.seed("{}:{}".format(item.config.getoption('name_seed'), item.nodeid))
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if exitstatus:
+        terminalreporter.line("Random name seed: {0} (replay with --name-seed={0})".format(
+            config.getoption('name_seed')))
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_names.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_names")
+
+    """)
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+'''
+pytest harness profiling plugin
+
+Using '--profile-harness' CLI option wall time of every check is split into:
+      - mkdir child: spawn-to-exit time of mkdir invocations
+      - plumbing: rest of time spent in process runner (mkdir_runner
+        commands and mkdir_async, with 'sh', subprocess and asyncio code
+        they call)
+      - fixtures: rest of setup and teardown phase, e.g. tmpdir creation
+      - test body: rest of call phase, e.g. result verification
+      - plugins: runtest hooks (setup, call, teardown, report creation and
+        logging) of plugins outside of pytest itself, e.g. the incremental
+        setup hook of pytest_mark_incremental or pytest_custom_output
+        reporting, session breakdown shows time of every plugin
+      - reporting: report creation and logging by pytest itself
+      - other: pytest overhead between phases
+CPU time of mkdir children (user + system) is shown for comparison.
+Hook wrappers count only with their own code before and after the yield.
+
+Python side is measured by cProfile, which slows it down, so absolute
+harness numbers are upper bounds. Breakdown per check and per session is
+printed before final test summary, merged profile is written in pstats
+format to '--profile-output' file if given. Code running in worker threads
+(e.g. thread pool of mkdir_stress) is not profiled and counts as test body.
+'''
+
+import cProfile
+import collections
+import os
+import pstats
+import time
+from typing import NamedTuple
+
+import pytest
+
+import mkdir_runner
+from pytest_mark_benchmark import BenchTable
+
+
+# Calls of these functions (file, name) from outside of them, including all
+# code they call, are time spent in process runner
+RUNNER_ENTRY_POINTS = {('mkdir_runner.py', '__call__'), ('mkdir_async.py', 'run_all')}
+
+# Hooks of plugins timed separately, with phase they are part of
+PLUGIN_HOOKS = {
+    'pytest_runtest_setup': 'fixtures',
+    'pytest_runtest_teardown': 'fixtures',
+    'pytest_runtest_call': 'body',
+    'pytest_runtest_makereport': 'reporting',
+    'pytest_runtest_logstart': 'reporting',
+    'pytest_runtest_logreport': 'reporting',
+    'pytest_runtest_logfinish': 'reporting',
+}
+
+BREAKDOWN_COLUMNS = ("total", "mkdir child", "child CPU", "plumbing", "fixtures",
+                     "test body", "plugins", "reporting", "other")
+
+
+class Breakdown(NamedTuple):
+    total: float = 0.0
+    child: float = 0.0
+    child_cpu: float = 0.0
+    plumbing: float = 0.0
+    fixtures: float = 0.0
+    body: float = 0.0
+    plugins: float = 0.0
+    reporting: float = 0.0
+    other: float = 0.0
+
+    def combine(self, other: 'Breakdown') -> 'Breakdown':
+        return Breakdown(*(mine + theirs for mine, theirs in zip(self, other)))
+
+
+def entry_time(stats: pstats.Stats, entry_points) -> float:
+    '''
+    Inclusive time of calls of entry point functions from outside of them
+
+    entry_points: set of (file name, function name)
+    '''
+    def is_entry(func):
+        return (os.path.basename(func[0]), func[2]) in entry_points
+
+    total = 0.0
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        if not is_entry(func):
+            continue
+        for caller, caller_stats in callers.items():
+            if not is_entry(caller):
+                total += caller_stats[3]
+    return total
+
+
+def plugin_label(plugin):
+    '''
+    Module name of plugin (module or instance of its class), None for
+    pytest's own plugins
+    '''
+    name = getattr(plugin, '__name__', None) or type(plugin).__module__
+    if name.split('.')[0] in ('_pytest', 'pytest', 'pluggy'):
+        return None
+    return name
+
+
+def _timed_function(function, add):
+    def timed(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            add(time.perf_counter() - start)
+    return timed
+
+
+def _timed_wrapper(function, add):
+    # Generator standing in for hook wrapper, times its parts around the yield
+    def timed(*args):
+        start = time.perf_counter()
+        try:
+            teardown = function(*args)
+            value = next(teardown)
+        finally:
+            add(time.perf_counter() - start)
+
+        try:
+            sent = yield value
+        except BaseException as exc:
+            start = time.perf_counter()
+            try:
+                teardown.throw(exc)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                add(time.perf_counter() - start)
+        else:
+            start = time.perf_counter()
+            try:
+                teardown.send(sent)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                add(time.perf_counter() - start)
+        raise RuntimeError("hook wrapper {!r} has second yield".format(function))
+    return timed
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_profile', 'harness profiling')
+    group.addoption('--profile-harness', action='store_true', dest='profile_harness',
+                    default=False,
+                    help="split time of checks into mkdir, runner plumbing, fixtures, test body, "
+                         "plugins and reporting")
+    group.addoption('--profile-output', action='store', dest='profile_output',
+                    default=None, metavar='PATH',
+                    help="write pstats dump of harness profile to given file")
+
+
+def pytest_configure(config):
+    if not config.getoption('profile_harness'):
+        return
+    if hasattr(config, 'workerinput') or getattr(config.option, 'numprocesses', None):
+        raise pytest.UsageError("--profile-harness can't be combined with distributed run "
+                                "(pytest-xdist)")
+    config.pluginmanager.register(HarnessProfiler(config), 'mkdir_harness_profiler')
+
+
+class HarnessProfiler:
+    '''
+    Profiles phases of every check and collects their time breakdown
+    '''
+
+    def __init__(self, config):
+        self.config = config
+        self.started = time.perf_counter()
+        self.session_stats = None
+        self.checks = []
+        self._profiles = {}
+        self._walls = collections.Counter()
+        self._child = 0.0
+        self._child_cpu = 0.0
+        self._plugins = collections.Counter()
+        self._plugin_phases = collections.Counter()
+        self.plugin_totals = collections.Counter()
+        self._original_hooks = {}
+        mkdir_runner.observers.append(self._observe)
+
+    def _observe(self, result):
+        self._child += result.elapsed
+
+    def _time_plugins(self):
+        # Plugins registered later (e.g. by other plugins) are picked up
+        # before every check
+        for hook_name, phase in PLUGIN_HOOKS.items():
+            for hookimpl in getattr(self.config.hook, hook_name).get_hookimpls():
+                plugin = plugin_label(hookimpl.plugin)
+                if (plugin is None or hookimpl.plugin is self
+                        or id(hookimpl) in self._original_hooks):
+                    continue
+
+                def add(elapsed, plugin=plugin, phase=phase):
+                    self._plugins[plugin] += elapsed
+                    self._plugin_phases[phase] += elapsed
+
+                self._original_hooks[id(hookimpl)] = (hookimpl, hookimpl.function)
+                timed = (_timed_wrapper if hookimpl.hookwrapper or hookimpl.wrapper
+                         else _timed_function)
+                hookimpl.function = timed(hookimpl.function, add)
+
+    def pytest_unconfigure(self):
+        for hookimpl, function in self._original_hooks.values():
+            hookimpl.function = function
+        self._original_hooks = {}
+
+    def _measure(self, category):
+        profile = self._profiles.setdefault(category, cProfile.Profile())
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._walls[category] += time.perf_counter() - start
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self._profiles = {}
+        self._walls = collections.Counter()
+        self._child = 0.0
+        self._child_cpu = 0.0
+        self._plugins = collections.Counter()
+        self._plugin_phases = collections.Counter()
+        self._description = None
+        self._time_plugins()
+
+        start = time.perf_counter()
+        yield
+        total = time.perf_counter() - start
+
+        stats = {category: pstats.Stats(profile) for category, profile in self._profiles.items()}
+        runner = {category: entry_time(category_stats, RUNNER_ENTRY_POINTS)
+                  for category, category_stats in stats.items()}
+        for category_stats in stats.values():
+            if self.session_stats is None:
+                self.session_stats = category_stats
+            else:
+                self.session_stats.add(category_stats)
+
+        runner_total = runner.get('fixtures', 0.0) + runner.get('body', 0.0)
+        child = min(self._child, runner_total)
+        self.checks.append((self._description or item.nodeid, Breakdown(
+            total=total,
+            child=child,
+            child_cpu=self._child_cpu,
+            plumbing=runner_total - child,
+            fixtures=(self._walls['fixtures'] - runner.get('fixtures', 0.0)
+                      - self._plugin_phases['fixtures']),
+            body=self._walls['body'] - runner.get('body', 0.0) - self._plugin_phases['body'],
+            plugins=sum(self._plugins.values()),
+            reporting=self._walls['reporting'] - self._plugin_phases['reporting'],
+            other=total - sum(self._walls.values()),
+        )))
+        self.plugin_totals.update(self._plugins)
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_setup(self, item):
+        yield from self._measure('fixtures')
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_call(self, item):
+        yield from self._measure('body')
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        yield from self._measure('fixtures')
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_makereport(self, item, call):
+        yield from self._measure('reporting')
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_logstart(self, nodeid, location):
+        yield from self._measure('reporting')
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_logreport(self, report):
+        rusage = getattr(report, 'rusage', None)
+        if rusage is not None:
+            self._child_cpu += rusage['user'] + rusage['system']
+        if self._description is None:
+            self._description = getattr(report, 'docstring_summary', None)
+        yield from self._measure('reporting')
+
+    @pytest.hookimpl(hookwrapper=True, tryfirst=True)
+    def pytest_runtest_logfinish(self, nodeid, location):
+        yield from self._measure('reporting')
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self._observe in mkdir_runner.observers:
+            mkdir_runner.observers.remove(self._observe)
+        if not self.checks:
+            return
+
+        per_check = BenchTable("Harness profile per check [ms]", ("check",) + BREAKDOWN_COLUMNS)
+        session = Breakdown()
+        for description, breakdown in self.checks:
+            session = session.combine(breakdown)
+            per_check.add_row(description, *("{:.1f}".format(1000 * value) for value in breakdown))
+
+        wall = time.perf_counter() - self.started
+        session_table = BenchTable("Harness profile of session ({:.3f}s wall time, {:.3f}s outside "
+                                   "of checks)".format(wall, wall - session.total),
+                                   ("part", "time [s]", "share of checks"))
+        def share(value):
+            return "{:.1f} %".format(100 * value / session.total) if session.total else "-"
+
+        for column, value in zip(BREAKDOWN_COLUMNS, session):
+            session_table.add_row(column, value, share(value))
+            if column == "plugins":
+                for plugin, plugin_time in self.plugin_totals.most_common():
+                    session_table.add_row("plugins: " + plugin, plugin_time, share(plugin_time))
+
+        for table in (per_check, session_table):
+            terminalreporter.line("")
+            for line in table.lines():
+                terminalreporter.line(line)
+
+        output = self.config.getoption('profile_output')
+        if self.session_stats is not None and output:
+            self.session_stats.dump_stats(output)
+            terminalreporter.line("")
+            terminalreporter.line("Harness profile written to {}".format(os.path.abspath(output)))
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_profile.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_profile")
+
+    """)
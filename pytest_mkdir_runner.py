@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+'''
+pytest process runner selection plugin
+
+Selects mkdir_runner backend used by all test modules:
+      - "--runner=spawn": lean os.posix_spawn() based runner (default)
+      - "--runner=forkserver": spawns delegated to long-lived helper process
+      - "--runner=sh": runner based on 'sh' package
+
+Default can be also changed using MKDIR_TESTER_RUNNER environment variable.
+
+Selects tested mkdir implementation using '--mkdir-binary' CLI option (name
+on PATH or path, 'mkdir' on PATH by default or MKDIR_TESTER_BINARY environment
+variable). When several binaries are given (comma-separated or repeated
+option), the whole suite is run against each of them in parallel and
+side-by-side comparison matrix is printed instead.
+
+Also configures limits of mkdir_async bulk invocation engine:
+      - "--concurrency=N": max number of concurrently running invocations
+      - "--case-timeout=SECONDS": time limit of single invocation
+'''
+
+import os
+
+import pytest
+
+import mkdir_async
+import mkdir_matrix
+import mkdir_runner
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_runner', 'mkdir process runner')
+    group.addoption('--runner', action='store', dest='mkdir_runner',
+                    choices=sorted(mkdir_runner.BACKENDS),
+                    default=os.environ.get('MKDIR_TESTER_RUNNER', mkdir_runner.DEFAULT_BACKEND),
+                    help="process runner backend used to execute mkdir (default: %(default)s)")
+    group.addoption('--mkdir-binary', action='append', dest='mkdir_binary',
+                    default=None, metavar='PATH',
+                    help="mkdir implementation to test, several comma-separated or repeated "
+                         "binaries are compared side by side (default: mkdir on PATH)")
+    group.addoption('--concurrency', action='store', dest='mkdir_concurrency', type=int,
+                    default=mkdir_async.concurrency_limit, metavar='N',
+                    help="max number of concurrent mkdir invocations in bulk checks "
+                         "(default: number of CPUs, %(default)s)")
+    group.addoption('--case-timeout', action='store', dest='mkdir_case_timeout', type=float,
+                    default=mkdir_async.DEFAULT_TIMEOUT, metavar='SECONDS',
+                    help="time limit of single mkdir invocation in bulk checks (default: %(default)s)")
+
+
+def mkdir_binaries(config):
+    '''
+    List of mkdir binaries selected by CLI option or environment
+    '''
+    values = config.getoption('mkdir_binary') or [os.environ.get('MKDIR_TESTER_BINARY', '')]
+    return [binary for value in values for binary in value.split(',') if binary]
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_cmdline_main(config):
+    binaries = mkdir_binaries(config)
+    if len(binaries) > 1:
+        return mkdir_matrix.run_matrix(binaries, config.invocation_params.args)
+    return None
+
+
+def pytest_configure(config):
+    binaries = mkdir_binaries(config)
+    if binaries:
+        mkdir_runner.set_binary(binaries[0])
+    mkdir_runner.set_backend(config.getoption('mkdir_runner'))
+    mkdir_async.configure(concurrency=config.getoption('mkdir_concurrency'),
+                          timeout=config.getoption('mkdir_case_timeout'))
+
+
+def pytest_unconfigure(config):
+    mkdir_runner.get_backend().close()
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_runner.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_runner")
+
+    """)
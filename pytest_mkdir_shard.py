@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+'''
+pytest duration-balanced sharding plugin
+
+Using '--shard=i/n' CLI option only i-th of n shards of selected checks is
+run, shards are balanced by historical durations of checks read from JSONL
+result files given by '--shard-durations' or from pytest cache, which is
+updated by every unsharded run. Sharded runs don't update the cache, so
+all shards balance on the same durations, shards run on several machines
+should use '--shard-durations'. See mkdir_shard for assignment rules and
+merging of shard results.
+'''
+
+import pytest
+
+import mkdir_shard
+
+
+_CACHE_KEY = 'mkdir_shard/durations'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_shard', 'sharding')
+    group.addoption('--shard', action='store', dest='shard', type=mkdir_shard.parse_shard,
+                    default=None, metavar='I/N', help="run only I-th of N duration-balanced shards of checks")
+    group.addoption('--shard-durations', action='append', dest='shard_durations', default=None,
+                    metavar='PATH',
+                    help="JSONL result file (--report-jsonl) with check durations used "
+                         "for balancing, pytest cache is used if not given")
+
+
+def pytest_configure(config):
+    # Cache is missing with '-p no:cacheprovider'
+    if (not hasattr(config, 'workerinput') and config.getoption('shard') is None
+            and getattr(config, 'cache', None) is not None):
+        config.pluginmanager.register(DurationRecorder(config), 'mkdir_shard_recorder')
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    shard = config.getoption('shard')
+    if shard is None:
+        return
+
+    index, count = shard
+    paths = config.getoption('shard_durations')
+    if paths:
+        durations = mkdir_shard.read_durations(paths)
+    elif getattr(config, 'cache', None) is not None:
+        durations = config.cache.get(_CACHE_KEY, {})
+    else:
+        durations = {}
+
+    assignment = mkdir_shard.assign_groups([item.nodeid for item in items], durations, count)
+
+    selected = []
+    deselected = []
+    for position, item in enumerate(items):
+        # Position in unsharded collection orders merged shard results
+        item.user_properties.append((mkdir_shard.COLLECTION_INDEX, position))
+        if assignment[mkdir_shard.group_id(item.nodeid)] == index - 1:
+            selected.append(item)
+        else:
+            deselected.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+class DurationRecorder:
+    '''
+    Stores durations of finished checks in pytest cache for future sharding
+    '''
+
+    def __init__(self, config):
+        self.config = config
+        self.durations = {}
+
+    def pytest_runtest_logreport(self, report):
+        # Repeated runs of a check (e.g. in soak mode) keep the last duration
+        if report.when == 'setup':
+            self.durations[report.nodeid] = 0.0
+        self.durations[report.nodeid] = self.durations.get(report.nodeid, 0.0) + report.duration
+
+    def pytest_sessionfinish(self):
+        if self.durations:
+            durations = self.config.cache.get(_CACHE_KEY, {})
+            durations.update(self.durations)
+            self.config.cache.set(_CACHE_KEY, durations)
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_shard.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_shard")
+
+    """)
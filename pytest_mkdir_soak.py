@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+'''
+pytest soak mode plugin
+
+Using '--soak=DURATION' CLI option (e.g. "90s", "30m", "8h") all selected
+checks are run repeatedly in cycles until given time elapses, to reveal slow
+degradation a single pass never shows. Every '--soak-interval' seconds and
+after the last cycle a snapshot line is printed:
+      - latency percentiles of mkdir invocations finished since last snapshot
+      - open file descriptors and resident memory of the harness process
+      - used inodes of the file system holding temporary test directories
+with drift of the last three against the first snapshot.
+
+Temporary directories of finished cycles are removed, so inode usage grows
+only if something outside of them leaks.
+'''
+
+import os
+import re
+import threading
+import time
+
+import pytest
+
+import mkdir_histogram
+import mkdir_runner
+import mkdir_verify
+import mkdir_workdir
+
+
+# Duration units accepted by '--soak'
+_DURATION_RE = re.compile(r'^\s*(\d+(?:\.\d*)?)\s*([smhd]?)\s*$')
+_DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+SOAK_PERCENTILES = (0.5, 0.99)
+
+
+def parse_duration(value: str) -> float:
+    '''
+    Duration in seconds from number with optional s/m/h/d unit
+    '''
+    match = _DURATION_RE.match(value)
+    if match is None:
+        raise ValueError("invalid duration '{}', use e.g. 90s, 30m or 8h".format(value))
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def open_fd_count() -> int:
+    return len(os.listdir('/proc/self/fd'))
+
+
+def resident_kb() -> int:
+    '''
+    Current resident set size of this process in kB
+    '''
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def used_inodes(path) -> int:
+    stats = os.statvfs(os.fspath(path))
+    return stats.f_files - stats.f_ffree
+
+
+class SoakMonitor:
+    '''
+    Collects mkdir latencies and formats periodic soak snapshots
+    '''
+
+    def __init__(self, basetemp):
+        self.basetemp = basetemp
+        self.start = time.monotonic()
+        self._latency = mkdir_histogram.Histogram()
+        self._lock = threading.Lock()
+        self._baseline = None
+
+    def record(self, result):
+        with self._lock:
+            self._latency.record(result.elapsed)
+
+    def snapshot(self, cycle: int) -> str:
+        with self._lock:
+            latency = self._latency
+            self._latency = mkdir_histogram.Histogram()
+
+        resources = (open_fd_count(), resident_kb(), used_inodes(self.basetemp))
+        if self._baseline is None:
+            self._baseline = resources
+        drift = [current - first for current, first in zip(resources, self._baseline)]
+
+        elapsed = int(time.monotonic() - self.start)
+        return "[SOAK] {:02d}:{:02d}:{:02d} cycle {}: {} calls {} max {:.3f} ms | " \
+            "fds {} ({:+d}) | RSS {} kB ({:+d}) | inodes used {} ({:+d})".format(
+                elapsed // 3600, elapsed // 60 % 60, elapsed % 60, cycle, latency.count,
+                " ".join("p{:g} {:.3f} ms".format(100 * fraction, 1000 * latency.percentile(fraction))
+                         for fraction in SOAK_PERCENTILES),
+                1000 * latency.max,
+                resources[0], drift[0], resources[1], drift[1], resources[2], drift[2])
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_soak', 'soak mode')
+    group.addoption('--soak', action='store', dest='soak', type=parse_duration, default=None,
+                    metavar='DURATION',
+                    help="run selected checks repeatedly for given time, e.g. 30m or 8h")
+    group.addoption('--soak-interval', action='store', dest='soak_interval', type=float,
+                    default=60.0, metavar='SECONDS',
+                    help="time between soak mode snapshots (default: %(default)s)")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtestloop(session):
+    config = session.config
+    duration = config.getoption('soak')
+    if duration is None:
+        return None
+
+    if config.pluginmanager.has_plugin('dsession'):
+        raise pytest.UsageError("--soak can't be combined with distributed run (pytest-xdist)")
+    if session.testsfailed and not config.option.continue_on_collection_errors:
+        raise session.Interrupted("{} error{} during collection".format(
+            session.testsfailed, "s" if session.testsfailed != 1 else ""))
+    if config.option.collectonly or not session.items:
+        return True
+
+    reporter = config.pluginmanager.getplugin('terminalreporter')
+    basetemp = config._tmp_path_factory.getbasetemp()
+    monitor = SoakMonitor(basetemp)
+    mkdir_runner.observers.append(monitor.record)
+
+    deadline = monitor.start + duration
+    interval = config.getoption('soak_interval')
+    next_snapshot = monitor.start + interval
+    cycle = 0
+    # Some check ran since the last snapshot
+    unreported = False
+
+    try:
+        reporter.line(monitor.snapshot(cycle))
+        while time.monotonic() < deadline:
+            cycle += 1
+            for index, item in enumerate(session.items):
+                # Last item of a cycle tears down all fixtures
+                nextitem = session.items[index + 1] if index + 1 < len(session.items) else None
+                item.config.hook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+                unreported = True
+                if session.shouldfail:
+                    raise session.Failed(session.shouldfail)
+                if session.shouldstop:
+                    raise session.Interrupted(session.shouldstop)
+
+                if time.monotonic() >= next_snapshot:
+                    reporter.line(monitor.snapshot(cycle))
+                    next_snapshot += interval
+                    unreported = False
+
+            remove_temp_dirs(basetemp)
+        if unreported:
+            reporter.line(monitor.snapshot(cycle))
+    finally:
+        mkdir_runner.observers.remove(monitor.record)
+
+    return True
+
+
+def remove_temp_dirs(basetemp):
+    '''
+    Remove temporary directories of finished checks from basetemp, working
+    directories of failed checks kept by mkdir_workdir pools are left for
+    inspection
+
+    Must be called only when all fixtures are finalized, i.e. between cycles.
+    '''
+    with os.scandir(str(basetemp)) as entries:
+        paths = [entry.path for entry in entries
+                 if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.')]
+    for path in paths:
+        if (os.path.basename(path).startswith(mkdir_workdir.POOL_DIR_PREFIX)
+                and os.path.isdir(os.path.join(path, mkdir_workdir.KEPT_DIR))):
+            # Closed pool holds nothing else, but stay on the safe side
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name != mkdir_workdir.KEPT_DIR:
+                        mkdir_verify.remove_tree(entry.path)
+            continue
+        mkdir_verify.remove_tree(path)
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_soak.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_soak")
+
+    """)
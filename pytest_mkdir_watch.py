@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+'''
+pytest watch mode plugin
+
+Using '--watch' CLI option the session stays resident after the first run
+of selected checks. Tested mkdir binary (path resolved by mkdir_runner, as
+checked by 'test_mkdir_is_executable') and files of collected test modules
+are polled every '--watch-interval' seconds and on change only affected
+checks are run again:
+      - changed test module is imported and collected again, all its
+        selected checks are run
+      - changed mkdir binary runs checks which used it in their last run,
+        either directly or through any of their fixtures
+Results are printed in the usual format, every cycle ends with its own
+summary line, final summary after Ctrl+C covers all cycles. Temporary
+directories of a cycle are kept until the next one starts.
+
+Changes of harness modules, plugins and conftest.py and new test modules
+need a restart.
+'''
+
+import collections
+import os
+import sys
+import time
+
+import pytest
+
+import mkdir_runner
+import pytest_mark_incremental
+from pytest_custom_output import format_summary
+from pytest_mkdir_soak import remove_temp_dirs
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_watch', 'watch mode')
+    group.addoption('--watch', action='store_true', dest='watch', default=False,
+                    help="keep running, re-run affected checks when mkdir binary or test "
+                         "modules change")
+    group.addoption('--watch-interval', action='store', dest='watch_interval', type=float,
+                    default=1.0, metavar='SECONDS',
+                    help="time between checks for changes in watch mode (default: %(default)s)")
+
+
+def file_signature(path):
+    '''
+    Identity of file content (inode, size, modification time), None if missing
+    '''
+    try:
+        file_stat = os.stat(path)
+    except OSError:
+        return None
+    return file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+
+
+class BinaryUsage:
+    '''
+    Checks and fixtures which resolved path of mkdir binary, i.e. ran it
+    or checked it in any way
+    '''
+
+    def __init__(self):
+        self.nodeid = None
+        self.checks = set()
+        self.fixtures = set()
+        self._fixture_stack = []
+
+    def record(self, path):
+        # Fixtures set up other fixtures they depend on, innermost one is used
+        if self._fixture_stack:
+            self.fixtures.add(self._fixture_stack[-1])
+        elif self.nodeid is not None:
+            self.checks.add(self.nodeid)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        self._fixture_stack.append(fixturedef.argname)
+        yield
+        self._fixture_stack.pop()
+
+    def uses_binary(self, item) -> bool:
+        return item.nodeid in self.checks or not self.fixtures.isdisjoint(item.fixturenames)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtestloop(session):
+    config = session.config
+    if not config.getoption('watch'):
+        return None
+
+    if config.pluginmanager.has_plugin('dsession'):
+        raise pytest.UsageError("--watch can't be combined with distributed run (pytest-xdist)")
+    if config.getoption('soak') is not None:
+        raise pytest.UsageError("--watch can't be combined with --soak")
+    if session.testsfailed and not config.option.continue_on_collection_errors:
+        raise session.Interrupted("{} error{} during collection".format(
+            session.testsfailed, "s" if session.testsfailed != 1 else ""))
+    if config.option.collectonly or not session.items:
+        return True
+
+    reporter = config.pluginmanager.getplugin('terminalreporter')
+    basetemp = config._tmp_path_factory.getbasetemp()
+    interval = config.getoption('watch_interval')
+
+    try:
+        binary = mkdir_runner.mkdir._path
+    except mkdir_runner.CommandNotFound:
+        binary = None
+    modules = {}
+    for item in session.items:
+        modules.setdefault(str(item.path), item.getparent(pytest.Module))
+    signatures = {path: file_signature(path) for path in [binary, *modules] if path}
+
+    usage = BinaryUsage()
+    config.pluginmanager.register(usage, 'mkdir_watch_usage')
+    mkdir_runner.path_observers.append(usage.record)
+    cycle = 1
+
+    try:
+        _run_cycle(session, session.items, usage, reporter, cycle,
+                   "running {} checks".format(len(session.items)))
+        while True:
+            reporter.line("[WATCH] waiting for changes of mkdir binary and {} test module{} "
+                          "(Ctrl+C to stop)".format(len(modules), "s" if len(modules) != 1 else ""))
+            changed = _wait_for_changes(signatures, interval)
+
+            cycle += 1
+            remove_temp_dirs(basetemp)
+            selected = []
+            for path in changed:
+                if path in modules:
+                    items = _recollect(session, modules[path])
+                    session.items = [item for item in session.items if str(item.path) != path]
+                    session.items.extend(items)
+                    selected.extend(items)
+            if binary in changed:
+                selected.extend(item for item in session.items if usage.uses_binary(item))
+
+            # Keep collection order of modules, every check is run once
+            order = {path: index for index, path in enumerate(modules)}
+            session.items.sort(key=lambda item: order[str(item.path)])
+            nodeids = {item.nodeid for item in selected}
+            selected = [item for item in session.items if item.nodeid in nodeids]
+
+            _run_cycle(session, selected, usage, reporter, cycle,
+                       "{} changed, running {} of {} checks".format(
+                           ", ".join(os.path.relpath(path) if path in modules else path
+                                     for path in changed),
+                           len(selected), len(session.items)))
+    except KeyboardInterrupt:
+        reporter.line("")
+        reporter.line("[WATCH] stopped after {} cycle{}".format(cycle, "s" if cycle != 1 else ""))
+    finally:
+        mkdir_runner.path_observers.remove(usage.record)
+        config.pluginmanager.unregister(usage)
+
+    return True
+
+
+def _wait_for_changes(signatures, interval):
+    '''
+    Poll watched files until some change, returns their paths
+    '''
+    while True:
+        time.sleep(interval)
+        changed = []
+        for path, signature in signatures.items():
+            current = file_signature(path)
+            if current != signature:
+                signatures[path] = current
+                changed.append(path)
+        if changed:
+            return changed
+
+
+def _recollect(session, module):
+    '''
+    Import test module again, returns its selected checks
+    '''
+    path = str(module.path)
+    for name, imported in list(sys.modules.items()):
+        if getattr(imported, '__file__', None) == path:
+            del sys.modules[name]
+
+    # Deselection (-k, -m, benchmarks) applies to new checks as well
+    items = list(session.genitems(pytest.Module.from_parent(module.parent, path=module.path)))
+    session.config.hook.pytest_collection_modifyitems(session=session, config=session.config,
+                                                      items=items)
+    return items
+
+
+def _run_cycle(session, items, usage, reporter, cycle, description):
+    reporter.line("")
+    reporter.line("[WATCH] cycle {}: {}".format(cycle, description))
+
+    counts = collections.Counter(getattr(reporter, 'counts', {}))
+    n_tests = getattr(reporter, 'n_tests', 0)
+
+    for item in items:
+        if 'incremental' in item.keywords:
+            pytest_mark_incremental.forget_failures(str(item.cls))
+
+    for index, item in enumerate(items):
+        # Last item of a cycle tears down all fixtures
+        nextitem = items[index + 1] if index + 1 < len(items) else None
+        usage.nodeid = item.nodeid
+        item.config.hook.pytest_runtest_protocol(item=item, nextitem=nextitem)
+        usage.nodeid = None
+        if session.shouldfail:
+            raise session.Failed(session.shouldfail)
+        if session.shouldstop:
+            raise session.Interrupted(session.shouldstop)
+
+    if hasattr(reporter, 'n_tests'):
+        reporter.line("[WATCH] cycle {}: {}".format(cycle, format_summary(
+            collections.Counter(reporter.counts) - counts, reporter.n_tests - n_tests)))
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_watch.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_watch")
+
+    """)
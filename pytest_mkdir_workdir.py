@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+'''
+pytest pooled working directory plugin
+
+Provides 'workdir' fixture, drop-in replacement of 'tmpdir' handing out
+clean directories from mkdir_workdir pool created in advance under pytest
+base temporary directory. Used directories are moved aside and removed in
+background, so large trees don't slow down teardown and don't pile up in
+retained base temporary directories. Directories of failed checks are kept
+in 'kept' subdirectory of the pool for inspection. Directories the pool
+failed to remove or create fail the session at its end.
+
+Number of directories prepared in advance is set by '--workdir-pool' CLI
+option.
+'''
+
+import py
+import pytest
+
+import mkdir_workdir
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('mkdir_workdir', 'pooled working directories')
+    group.addoption('--workdir-pool', action='store', dest='workdir_pool', type=int,
+                    default=mkdir_workdir.DEFAULT_POOL_SIZE, metavar='N',
+                    help="number of working directories prepared in advance "
+                         "(default: %(default)s)")
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    if outcome.get_result().failed:
+        item.workdir_failed = True
+
+
+@pytest.fixture(scope='session')
+def workdir_pool(request, tmpdir_factory):
+    '''
+    Session wide pool of working directories, removed at the end of session,
+    fails if some directory couldn't be removed or created in background
+    '''
+    pool = mkdir_workdir.WorkdirPool(tmpdir_factory.mktemp(mkdir_workdir.POOL_DIR_PREFIX),
+                                     size=request.config.getoption('workdir_pool'))
+    yield pool
+    pool.close()
+    if pool.errors:
+        pytest.fail("Working directory pool failed for {} directories: {}".format(
+            len(pool.errors), "; ".join("{} ({})".format(path, exc)
+                                        for path, exc in pool.errors[:5])))
+
+
+@pytest.fixture
+def workdir(request, workdir_pool):
+    '''
+    Clean working directory of single check (py.path.local like tmpdir)
+
+    Directory of failed check is kept in 'kept' subdirectory of the pool,
+    it survives removal of temporary directories between soak and watch
+    mode cycles as well
+    '''
+    path = workdir_pool.acquire()
+    yield py.path.local(path)
+    if getattr(request.node, 'workdir_failed', False):
+        workdir_pool.keep(path)
+    else:
+        workdir_pool.release(path)
+
+
+if __name__ == "__main__":
+    print("""pytest_mkdir_workdir.py pytest plugin
+
+This script should not be run directly but rather configured as pytest plugin
+and loaded using following directive in conftest.py configuration file:
+
+pytest_plugins = ("pytest_mkdir_workdir")
+
+    """)
@@ -15,17 +15,19 @@ class TestPrerequisities:
         try:
             import sh
         except ModuleNotFoundError:
-            pytest.fail(msg="Required package 'sh' is not installed")
+            pytest.fail("Required package 'sh' is not installed")
 
     def test_mkdir_is_available(self):
         '''Selfcheck: mkdir is available'''
+        import mkdir_runner
+
         try:
-            from sh import mkdir
-        except ImportError:
-            pytest.fail(msg="mkdir command is not available")
+            mkdir_runner.mkdir._path
+        except mkdir_runner.CommandNotFound:
+            pytest.fail("mkdir command is not available")
 
     def test_mkdir_is_executable(self):
         '''Selfcheck: mkdir is executable'''
-        import sh
+        import mkdir_runner
 
-        assert os.access(sh.mkdir._path, os.X_OK), "mkdir command is not executable"
+        assert os.access(mkdir_runner.mkdir._path, os.X_OK), "mkdir command is not executable"
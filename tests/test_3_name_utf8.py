@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
-import py
-import random
-import sh
+import mkdir_async
+import mkdir_names
+import mkdir_runner
+import pytest
 
 
 class TestNameUtf8:
@@ -14,53 +15,38 @@ class TestNameUtf8:
     DIR_NAME_UTF8_LENGTH_MAX = 63  # UTF-8 data-points can be up to 4 bytes long
     # max allowed filename byte length is 255 bytes
 
-    @staticmethod
-    def get_random_utf8_string(lower_limit=1, upper_limit=20):
+    UTF8_NAME_COUNT = 8  # random names created concurrently, one check per name
+
+    @pytest.fixture(scope='class')
+    def utf8_results(self, tmpdir_factory):
         '''
-        Generate random UTF8-encoded string
+        Create all random UTF-8 named directories concurrently, once per class
         '''
+        path_parent = tmpdir_factory.mktemp('utf8')
 
-        # Code point ranges to be sampled, update as needed
-        include_ranges = [
-            (0x0021, 0x0021),
-            (0x0023, 0x0026),
-            (0x0028, 0x007E),
-            (0x00A1, 0x00AC),
-            (0x00AE, 0x00FF),
-            (0x0100, 0x017F),
-            (0x0180, 0x024F),
-            (0x2C60, 0x2C7F),
-            (0x16A0, 0x16F0),
-            (0x0370, 0x0377),
-            (0x037A, 0x037E),
-            (0x0384, 0x038A),
-            (0x038C, 0x038C),
-        ]
+        # Names are unique and never reserved '.' and '..' names
+        names = mkdir_names.UTF8.batch(
+            TestNameUtf8.UTF8_NAME_COUNT, TestNameUtf8.DIR_NAME_UTF8_LENGTH_MIN,
+            TestNameUtf8.DIR_NAME_UTF8_LENGTH_MAX, max_bytes=mkdir_names.NAME_MAX, unique=True)
 
-        alphabet = [
-            chr(code_point) for current_range in include_ranges
-            for code_point in range(current_range[0], current_range[1] + 1)
-        ]
-        rand_length = random.randint(lower_limit, upper_limit)
+        results = mkdir_async.run_all({
+            index: mkdir_async.Invocation((path_parent.join(name),))
+            for index, name in enumerate(names)
+        })
 
-        return ''.join(random.choice(alphabet) for _ in range(rand_length))
+        return path_parent, names, results
 
-    def test_create_dir_utf8(self, tmpdir):
+    @pytest.mark.parametrize('name_index', range(UTF8_NAME_COUNT))
+    def test_create_dir_utf8(self, utf8_results, name_index):
         '''Create directory: random length UTF-8 name'''
-        name_newdir = TestNameUtf8.get_random_utf8_string(
-            TestNameUtf8.DIR_NAME_UTF8_LENGTH_MIN, TestNameUtf8.DIR_NAME_UTF8_LENGTH_MAX)
-        name_newdir = name_newdir.replace('/', '')
-        path_newdir = tmpdir.join(name_newdir)
+        path_parent, names, results = utf8_results
+        path_newdir = path_parent.join(names[name_index])
 
-        # Make sure directory doesn't already exist
         try:
-            path_newdir.remove(rec=1, ignore_errors=True)
-        except py.error.ENOENT:
-            # Ignore 'No such file or directory' error
-            pass
-        assert not path_newdir.check(), "Failed test setup - directory '{}' not removed".format(path_newdir)
-
-        sh.mkdir(path_newdir)
+            mkdir_runner.check_exit_code(results[name_index])
+        except mkdir_runner.ErrorReturnCode as exc:
+            pytest.fail("Failed to create UTF8 named directory '{}', exit code {}".format(
+                path_newdir, exc.exit_code))
 
         # Directory should now exist
         assert path_newdir.check(), "Failed to create UTF8 named directory '{}'".format(path_newdir)
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 
-import py
-import sh
+import mkdir_runner
+import mkdir_verify
+from typing import List
 
 
 class TestDirMultiple:
@@ -9,14 +10,12 @@ class TestDirMultiple:
     Class for grouping multiple directory creation tests.
     """
 
-    # Generator for given number of directory paths
+    # Given number of directory names
     @staticmethod
-    def get_path(tmpdir: py.path.local, count: int) -> py.path.local:
-        for dir_id in range(count):
-            name = 'testdir{}'.format(dir_id)
-            yield tmpdir.join(name)
+    def get_names(count: int) -> List[str]:
+        return ['testdir{}'.format(dir_id) for dir_id in range(count)]
 
-    def test_create_multiple_sibling_dirs(self, tmpdir):
+    def test_create_multiple_sibling_dirs(self, workdir):
         '''Create directory: multiple siblings'''
         # Expected outcome: all directories are created
 
@@ -24,9 +23,11 @@ class TestDirMultiple:
         # but bash allows only approx. 26626 parameters to an executable
         DIR_COUNT = 1000
 
+        names = TestDirMultiple.get_names(DIR_COUNT)
+
         # Pass all directory names at once using argument unpacking
-        sh.mkdir(*TestDirMultiple.get_path(tmpdir, DIR_COUNT))
+        mkdir_runner.mkdir(*names, _cwd=workdir)
 
-        # Check that all directories were created
-        for path in TestDirMultiple.get_path(tmpdir, DIR_COUNT):
-            assert path.check(), "Failed to create directory '{}'".format(path)
+        # Check that all directories were created using single directory listing
+        result = mkdir_verify.verify_tree(workdir, names)
+        assert result.ok, "Failed to create directories: {}".format(result.describe())
@@ -1,8 +1,34 @@
 #!/usr/bin/env python3
 
-from io import StringIO
+import mkdir_async
+import mkdir_runner
+import mkdir_stress
+import mkdir_verify
 import pytest
-import sh
+
+
+# Invocations not touching filesystem, independent of each other
+OPTION_INVOCATIONS = {
+    'no_operand': (),
+    'help': ('--help',),
+    'version': ('--version',),
+    'parents_short': ('-p',),
+    'parents_long': ('--parents',),
+    'mode_short': ('-m',),
+    'mode_long': ('--mode',),
+    'delimiter': ('--',),
+    'unknown': ('--aaaaaaaaaa',),
+}
+
+
+@pytest.fixture(scope='class')
+def option_results():
+    '''
+    Run all OPTION_INVOCATIONS concurrently, once per class
+    '''
+    return mkdir_async.run_all({
+        key: mkdir_async.Invocation(args) for key, args in OPTION_INVOCATIONS.items()
+    })
 
 
 class TestOptions:
@@ -11,47 +37,45 @@ class TestOptions:
     """
 
     @pytest.mark.debug
-    def test_option_no_operand(self):
+    def test_option_no_operand(self, option_results):
         '''Option: no operand specified'''
         # Expected outcome: mkdir displays error message, exit code = 1
 
-        err_output = StringIO()
-
         try:
-            sh.mkdir(_err=err_output)
-        except sh.ErrorReturnCode as exc:
-            assert 'missing operand' in err_output.getvalue(), "Invalid STDERR output text"
+            mkdir_runner.check_exit_code(option_results['no_operand'])
+        except mkdir_runner.ErrorReturnCode as exc:
+            assert 'missing operand' in exc.stderr.decode(errors='replace'), "Invalid STDERR output text"
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Did not raise error when ran without any operands")
 
-    def test_option_help(self):
+    def test_option_help(self, option_results):
         """Option '--help'"""
         # Expected outcome: help text is displayed, exit code = 0
 
-        std_output = StringIO()
+        result = option_results['help']
 
         try:
-            sh.mkdir("--help", _out=std_output)
-        except sh.ErrorReturnCode:
+            mkdir_runner.check_exit_code(result)
+        except mkdir_runner.ErrorReturnCode:
             pytest.fail("Returned with non-zero exit code")
         else:
-            assert 'Usage:' in std_output.getvalue(), "Invalid help text"
+            assert 'Usage:' in result.stdout.decode(errors='replace'), "Invalid help text"
 
-    def test_option_version(self):
+    def test_option_version(self, option_results):
         """Option '--version'"""
         # Expected outcome: version is displayed, exit code = 0
 
-        std_output = StringIO()
+        result = option_results['version']
 
         try:
-            sh.mkdir("--version", _out=std_output)
-        except sh.ErrorReturnCode:
+            mkdir_runner.check_exit_code(result)
+        except mkdir_runner.ErrorReturnCode:
             pytest.fail("Returned with non-zero exit code")
         else:
-            assert 'mkdir (GNU coreutils)' in std_output.getvalue(), "Invalid version text"
+            assert 'mkdir (GNU coreutils)' in result.stdout.decode(errors='replace'), "Invalid version text"
 
-    def test_option_parents_nested_dirs(self, tmpdir):
+    def test_option_parents_nested_dirs(self, workdir):
         '''Option '-p/--parents': create nested directories'''
         # Expected outcome: Nested directory structure is created, exit code = 0
 
@@ -60,43 +84,66 @@ class TestOptions:
 
         nested_name = '/'.join(['testdir{}'.format(i) for i in range(NESTED_COUNT)])
 
-        path_nested = tmpdir.join(nested_name)
+        path_nested = workdir.join(nested_name)
 
         assert len(str(path_nested)) < PATH_MAX, "Incorrect test setup - directory path too long"
 
         # Try creating nested directories without '-p' CLI option
         try:
-            sh.mkdir(path_nested)
-        except sh.ErrorReturnCode as exc:
+            mkdir_runner.mkdir(path_nested)
+        except mkdir_runner.ErrorReturnCode as exc:
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Accepted directory name containing forward slash without '-p/--parents' CLI option")
 
         # Create nested directories using '-p' CLI option
         try:
-            sh.mkdir("-p", path_nested)
-        except sh.ErrorReturnCode:
+            mkdir_runner.mkdir("-p", path_nested)
+        except mkdir_runner.ErrorReturnCode:
             pytest.fail("Failed to create nested directories using '-p' CLI option")
         else:
             assert path_nested.check(), "Failed to create nested directories using '-p' CLI option"
 
         # Remove created directories
-        first_dir_path = tmpdir.join('testdir0')
+        first_dir_path = workdir.join('testdir0')
         first_dir_path.remove(rec=1)
 
         # Create nested directories using '--parents' CLI option
         try:
-            sh.mkdir("--parents", path_nested)
-        except sh.ErrorReturnCode:
+            mkdir_runner.mkdir("--parents", path_nested)
+        except mkdir_runner.ErrorReturnCode:
             pytest.fail("Failed to create nested directories using '--parents' CLI option")
         else:
             assert path_nested.check(), "Failed to create nested directories using '--parents' CLI option"
 
-    def test_option_parents_suppress_error(self, tmpdir):
+    def test_option_parents_past_path_max(self, workdir):
+        '''Option '-p/--parents': create nested directories past PATH_MAX'''
+        # Expected outcome: Nested directory structure longer than PATH_MAX is
+        # created from relative path, exit code = 0
+
+        PATH_MAX = 4096
+        NESTED_COUNT = 600
+
+        nested_name = '/'.join(['testdir'] * NESTED_COUNT)
+
+        assert len(nested_name) > PATH_MAX, "Incorrect test setup - directory path too short"
+
+        try:
+            mkdir_runner.mkdir("-p", nested_name, _cwd=workdir)
+        except mkdir_runner.ErrorReturnCode:
+            pytest.fail("Failed to create nested directories past PATH_MAX using '-p' CLI option")
+
+        # Absolute path can't be used for checking, verify relative to descriptors
+        result = mkdir_verify.verify_tree(workdir, [nested_name])
+        mkdir_verify.remove_tree(workdir.join('testdir'))
+        assert result.ok, "Failed to create nested directories past PATH_MAX: {}".format(
+            result.describe())
+
+    def test_option_parents_suppress_error(self, workdir):
         '''Option '-p/--parents': ignore already existing directories'''
         # Expected outcome: mkdir recreates directory, exit code = 0
 
-        path_newdir = tmpdir.join('testdir')
+        path_newdir = workdir.join('testdir')
 
         # Using built-in mkdir
         path_newdir.mkdir()
@@ -104,8 +151,8 @@ class TestOptions:
 
         # Recreate existing directory using '-p' CLI option
         try:
-            sh.mkdir("-p", path_newdir)
-        except sh.ErrorReturnCode:
+            mkdir_runner.mkdir("-p", path_newdir)
+        except mkdir_runner.ErrorReturnCode:
             pytest.fail("Failed to recreate existing directory using '-p' CLI option")
         else:
             # Directory should still exist
@@ -113,101 +160,108 @@ class TestOptions:
 
         # Recreate existing directory using '--parents' CLI option
         try:
-            sh.mkdir("--parents", path_newdir)
-        except sh.ErrorReturnCode:
+            mkdir_runner.mkdir("--parents", path_newdir)
+        except mkdir_runner.ErrorReturnCode:
             pytest.fail("Failed to recreate existing directory using '--parents' CLI option")
         else:
             # Directory should still exist
             assert path_newdir.check(), "Failed to recreate existing directory using '--parents' CLI option"
 
-    def test_option_parents_no_operand(self):
+    @pytest.mark.parametrize('pool', mkdir_stress.POOLS)
+    def test_option_parents_concurrent_overlap(self, workdir, pool):
+        '''Option '-p/--parents': concurrent creation of overlapping trees ({pool} pool)'''
+        # Expected outcome: racing creators of shared ancestors all succeed,
+        # exit code = 0 for every invocation and the whole tree is created
+
+        CONCURRENCY = 16
+        INVOCATION_COUNT = 64
+
+        path_sets, leaves = mkdir_stress.overlapping_path_sets(3, 3, INVOCATION_COUNT, 6)
+        stress = mkdir_stress.run_stress(workdir, path_sets, CONCURRENCY, pool)
+
+        failed = stress.failed
+        assert not failed, "{} of {} concurrent invocations failed, first: {}, {}".format(
+            len(failed), len(stress.results), failed[0].status,
+            failed[0].stderr.decode(errors='replace').strip())
+
+        result = mkdir_verify.verify_tree(workdir, leaves)
+        assert result.ok, "Incomplete tree after concurrent creation: {}".format(result.describe())
+
+    def test_option_parents_no_operand(self, option_results):
         '''Option '-p/--parents': no operand'''
         # Expected outcome: mkdir displays error message, exit code = 1
 
-        err_output = StringIO()
-
         try:
-            sh.mkdir('-p', _err=err_output)
-        except sh.ErrorReturnCode as exc:
-            assert 'missing operand' in err_output.getvalue(), "Invalid STDERR output text"
+            mkdir_runner.check_exit_code(option_results['parents_short'])
+        except mkdir_runner.ErrorReturnCode as exc:
+            assert 'missing operand' in exc.stderr.decode(errors='replace'), "Invalid STDERR output text"
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Accepted '-p' CLI option without operand")
 
-        err_output = StringIO()
-
         try:
-            sh.mkdir('--parents', _err=err_output)
-        except sh.ErrorReturnCode as exc:
-            assert 'missing operand' in err_output.getvalue(), "Invalid STDERR output text"
+            mkdir_runner.check_exit_code(option_results['parents_long'])
+        except mkdir_runner.ErrorReturnCode as exc:
+            assert 'missing operand' in exc.stderr.decode(errors='replace'), "Invalid STDERR output text"
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Accepted '--parents' CLI option without operand")
 
-    def test_option_mode_no_operand(self):
+    def test_option_mode_no_operand(self, option_results):
         '''Option '-m/--mode': no operand'''
         # Expected outcome: mkdir displays error message, exit code = 1
 
-        err_output = StringIO()
-
         try:
-            sh.mkdir('-m', _err=err_output)
-        except sh.ErrorReturnCode as exc:
-            assert 'requires an argument' in err_output.getvalue(), "Invalid STDERR output text"
+            mkdir_runner.check_exit_code(option_results['mode_short'])
+        except mkdir_runner.ErrorReturnCode as exc:
+            assert 'requires an argument' in exc.stderr.decode(errors='replace'), "Invalid STDERR output text"
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Accepted '-m' CLI option without operand")
 
-        err_output = StringIO()
-
         try:
-            sh.mkdir('--mode', _err=err_output)
-        except sh.ErrorReturnCode as exc:
-            assert 'requires an argument' in err_output.getvalue(), "Invalid STDERR output text"
+            mkdir_runner.check_exit_code(option_results['mode_long'])
+        except mkdir_runner.ErrorReturnCode as exc:
+            assert 'requires an argument' in exc.stderr.decode(errors='replace'), "Invalid STDERR output text"
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Accepted '--mode' CLI option without operand")
 
-    def test_option_delimiter_create_dir(self, tmpdir):
+    def test_option_delimiter_create_dir(self, workdir):
         '''Option '--': create directory name starting with '-' '''
         # Expected outcome: directory is created, exit code = 0
 
         name_newdir = '-a'
-        path_newdir = tmpdir.join(name_newdir)
-        tmpdir.chdir()
+        path_newdir = workdir.join(name_newdir)
 
         try:
-            sh.mkdir('--', name_newdir)
-        except sh.ErrorReturnCode:
+            mkdir_runner.mkdir('--', name_newdir, _cwd=workdir)
+        except mkdir_runner.ErrorReturnCode:
             pytest.fail("Failed to create directory '{}'".format(name_newdir))
         else:
             # Directory should exist
             assert path_newdir.check(), "Failed to create directory '{}'".format(name_newdir)
 
-    def test_option_delimiter_no_operand(self):
+    def test_option_delimiter_no_operand(self, option_results):
         '''Option '--': no operand'''
         # Expected outcome: mkdir displays error message, exit code = 1
 
-        err_output = StringIO()
-
         try:
-            sh.mkdir('--', _err=err_output)
-        except sh.ErrorReturnCode as exc:
-            assert 'missing operand' in err_output.getvalue(), "Invalid STDERR output text"
+            mkdir_runner.check_exit_code(option_results['delimiter'])
+        except mkdir_runner.ErrorReturnCode as exc:
+            assert 'missing operand' in exc.stderr.decode(errors='replace'), "Invalid STDERR output text"
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Accepted '--' CLI option without operand")
 
-    def test_option_unknown(self):
+    def test_option_unknown(self, option_results):
         '''Option unknown'''
         # Expected outcome: 'unrecognized option' text is displayed, exit code = 1
 
-        err_output = StringIO()
-
         try:
-            sh.mkdir("--aaaaaaaaaa", _err=err_output)
-        except sh.ErrorReturnCode as exc:
-            assert 'unrecognized option' in err_output.getvalue(), "Invalid STDERR output text"
+            mkdir_runner.check_exit_code(option_results['unknown'])
+        except mkdir_runner.ErrorReturnCode as exc:
+            assert 'unrecognized option' in exc.stderr.decode(errors='replace'), "Invalid STDERR output text"
             assert exc.exit_code == 1, "Invalid exit code returned ({})".format(exc.exit_code)
         else:
             pytest.fail("Failed to return non-zero exit code")
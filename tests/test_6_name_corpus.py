@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import shutil
+
+import mkdir_batch
+import mkdir_corpus
+import pytest
+
+
+CORPUS_BATCH_SIZE = 1000    # names passed to single batched mkdir run
+FAILURE_SAMPLE = 5          # failed names reported per byte class
+
+
+@pytest.fixture(scope='module')
+def corpus_outcomes(request, tmpdir_factory):
+    '''
+    Stream corpus names to mkdir in batches, outcomes grouped by byte class
+    '''
+    outcomes = {byte_class: {'total': 0, 'failed': 0, 'sample': []}
+                for byte_class in mkdir_corpus.BYTE_CLASSES}
+
+    for batch in mkdir_corpus.iter_batches(request.config.getoption('name_corpus'),
+                                           CORPUS_BATCH_SIZE):
+        # Every batch gets its own directory, removed once verified
+        path_batch = tmpdir_factory.mktemp('corpus')
+        result = mkdir_batch.run_batch(path_batch, batch)
+
+        for name, operand in result.results.items():
+            outcome = outcomes[mkdir_corpus.byte_class(name)]
+            outcome['total'] += 1
+            if not operand.created:
+                outcome['failed'] += 1
+                if len(outcome['sample']) < FAILURE_SAMPLE:
+                    outcome['sample'].append("{!r} ({})".format(name, operand.message))
+
+        shutil.rmtree(str(path_batch))
+
+    return outcomes
+
+
+class TestNameCorpus:
+    """
+    Class for grouping directory creation tests using names from corpus file.
+    """
+
+    @pytest.mark.parametrize('byte_class', mkdir_corpus.BYTE_CLASSES)
+    def test_create_dir_corpus_names(self, corpus_outcomes, byte_class):
+        """Create directory: corpus names of byte class '{byte_class}'"""
+        # Expected outcome: all directories are created, file system layer
+        # accepts any bytes except NUL and forward slash
+
+        outcome = corpus_outcomes[byte_class]
+
+        assert not outcome['failed'], "Failed to create {} of {} directories: {}".format(
+            outcome['failed'], outcome['total'], ", ".join(outcome['sample']))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+
+import mkdir_async
+import mkdir_pairwise
+import mkdir_verify
+import pytest
+
+
+COMBINATION_STRENGTH = 2    # every pair of option values is used at least once
+UMASK = 0o022
+
+# Argument values of man page options taking one, '8' is invalid mode
+OPTION_DOMAINS = {
+    '--mode': ['700', '755', 'u=rwx,go=', '8'],
+}
+
+# Resulting permission bits of valid modes from OPTION_DOMAINS
+MODE_BITS = {'700': 0o700, '755': 0o755, 'u=rwx,go=': 0o700}
+
+# Operands of every kind, 'existing' directory is created before the run
+OPERANDS = {
+    'none': (),
+    'new': ('newdir',),
+    'two': ('dir1', 'dir2'),
+    'existing': ('existing',),
+    'nested': ('parent/child',),
+    'dash': ('-dashdir',),
+    'empty': ('',),
+}
+
+EXISTING_MODE = 0o711
+
+
+def _combinations():
+    '''
+    Covering array of man page options, delimiter and operand kinds
+    '''
+    factors = mkdir_pairwise.option_factors(
+        mkdir_pairwise.parse_man_options(mkdir_pairwise.DEFAULT_MAN_PAGE), OPTION_DOMAINS)
+    factors.append(mkdir_pairwise.Factor('delimiter', [None, ('--',)]))
+    factors.append(mkdir_pairwise.Factor('operands', list(OPERANDS)))
+
+    # '--help' and '--version' end processing, other options are not exercised
+    names = [factor.name for factor in factors]
+    dominant = {names.index(name): {1} for name in ('--help', '--version') if name in names}
+
+    combinations = {}
+    for row in mkdir_pairwise.covering_array([len(factor.values) for factor in factors],
+                                             COMBINATION_STRENGTH, dominant=dominant):
+        case = {factor.name: factor.values[index] for factor, index in zip(factors, row)}
+        args = [arg for factor in factors[:-1] for arg in (case[factor.name] or ())]
+        operand_kind = case['operands']
+        args.extend(OPERANDS[operand_kind])
+        combinations[" ".join(repr(arg) if not arg or ' ' in arg else arg for arg in args)
+                     or "(no arguments)"] = (case, args)
+    return combinations
+
+
+COMBINATIONS = _combinations()
+
+
+def expected_outcome(case):
+    '''
+    Exit code, STDOUT/STDERR expectations and created directories of case
+
+    Returns dict with keys 'exit_code', 'created' (directories reported
+    in verbose STDOUT lines, None if STDOUT isn't verbose output),
+    'stdout_text', 'stderr_text' (substrings or None) and 'modes'
+    (path -> expected permission bits of directories existing after run).
+    '''
+    options = [value[0] for name, value in case.items()
+               if name not in ('delimiter', 'operands') and value]
+    operand_kind = case['operands']
+    operands = OPERANDS[operand_kind]
+    parents = bool(case['--parents'])
+    verbose = bool(case['--verbose'])
+    # Mode is either separate argument ('-m 700') or part of it ('--mode=700')
+    mode = case['--mode'][-1].partition('--mode=')[2] or case['--mode'][-1] \
+        if case['--mode'] else None
+
+    modes = {'existing': EXISTING_MODE}
+    outcome = {'exit_code': 0, 'created': [], 'stdout_text': None, 'stderr_text': None,
+               'modes': modes}
+
+    # Informational options take effect in order of appearance
+    info = [option for option in options if option in ('--help', '--version')]
+    if info:
+        outcome['created'] = None
+        outcome['stdout_text'] = 'Usage:' if info[0] == '--help' else 'mkdir'
+        return outcome
+
+    if operand_kind == 'dash' and not case['delimiter']:
+        outcome.update(exit_code=1, stderr_text='invalid option')
+        return outcome
+    if not operands:
+        outcome.update(exit_code=1, stderr_text='missing operand')
+        return outcome
+    if mode is not None and mode not in MODE_BITS:
+        outcome.update(exit_code=1, stderr_text='invalid mode')
+        return outcome
+
+    final_mode = MODE_BITS[mode] if mode is not None else 0o777 & ~UMASK
+    created = []
+    if operand_kind == 'existing':
+        if not parents:
+            outcome.update(exit_code=1, stderr_text='File exists')
+    elif operand_kind == 'empty':
+        outcome.update(exit_code=1, stderr_text='No such file or directory')
+    elif operand_kind == 'nested':
+        if parents:
+            # Parent directories ignore '-m', get u+wx on top of umask default
+            modes['parent'] = (0o777 & ~UMASK) | stat.S_IWUSR | stat.S_IXUSR
+            created.append('parent')
+            created.append('parent/child')
+        else:
+            outcome.update(exit_code=1, stderr_text='No such file or directory')
+    else:
+        created.extend(operands)
+
+    for path in created:
+        modes.setdefault(path, final_mode)
+    if verbose:
+        outcome['created'] = created
+    return outcome
+
+
+@pytest.fixture(scope='class')
+def combination_results(tmpdir_factory):
+    '''
+    Run every combination concurrently, each in its own directory
+    '''
+    root = tmpdir_factory.mktemp('option_pairs')
+    env = dict(os.environ, LC_ALL='C')
+    invocations = {}
+    case_dirs = {}
+
+    for index, (combination, (case, args)) in enumerate(COMBINATIONS.items()):
+        case_dir = root.mkdir(str(index))
+        existing = case_dir.mkdir('existing')
+        existing.chmod(EXISTING_MODE)
+        case_dirs[combination] = case_dir
+        invocations[combination] = mkdir_async.Invocation(args, cwd=str(case_dir), env=env,
+                                                          umask=UMASK)
+
+    return case_dirs, mkdir_async.run_all(invocations)
+
+
+class TestOptionPairs:
+    """
+    Class for grouping tests of option combinations from pairwise covering array.
+    """
+
+    @pytest.mark.parametrize('combination', list(COMBINATIONS))
+    def test_option_combination(self, combination_results, combination):
+        '''Option combination: {combination}'''
+        # Expected outcome: exit code, output and created directories with
+        # their modes match combined effect of all options
+
+        case_dirs, results = combination_results
+        case, _ = COMBINATIONS[combination]
+        result = results[combination]
+        expected = expected_outcome(case)
+
+        assert not result.timed_out, "mkdir {}".format(result.status)
+        assert result.exit_code == expected['exit_code'], \
+            "Invalid exit code returned ({}), STDERR: {!r}".format(result.exit_code, result.stderr)
+        if expected['created'] is not None:
+            # Messages are prefixed by program name as invoked
+            program = os.fsdecode(result.argv[0])
+            stdout = "".join("{}: created directory '{}'\n".format(program, path)
+                             for path in expected['created'])
+            assert result.stdout.decode(errors='replace') == stdout, \
+                "Invalid STDOUT output text: {!r}".format(result.stdout)
+        if expected['stdout_text'] is not None:
+            assert expected['stdout_text'] in result.stdout.decode(errors='replace'), \
+                "Invalid STDOUT output text"
+        if expected['stderr_text'] is not None:
+            assert expected['stderr_text'] in result.stderr.decode(errors='replace'), \
+                "Invalid STDERR output text: {!r}".format(result.stderr)
+        elif expected['exit_code'] == 0:
+            assert not result.stderr, "Unexpected STDERR output text: {!r}".format(result.stderr)
+
+        verified = mkdir_verify.verify_tree(case_dirs[combination], expected['modes'])
+        assert verified.ok, verified.describe()
+        for path, mode in expected['modes'].items():
+            actual = stat.S_IMODE(os.stat(str(case_dirs[combination].join(path))).st_mode)
+            assert actual == mode, "Invalid mode {:o} of '{}', expected {:o}".format(
+                actual, path, mode)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+
+import mkdir_async
+import mkdir_modes
+import mkdir_verify
+import pytest
+from pytest_mkdir_modes import mode_umask_pairs
+
+
+OPERANDS = ['d{:02}'.format(index) for index in range(8)]   # created by every invocation
+FAILURE_SAMPLE = 5      # failed (mode, umask) pairs reported per check
+
+# Octal modes grouped by their special bits digit
+OCTAL_BLOCKS = ['{0}000-{0}777'.format(digit) for digit in range(8)]
+
+
+def _check_key(mode):
+    if mode in mkdir_modes.SYMBOLIC_MODES:
+        return 'symbolic', mode
+    return 'octal', '{0}000-{0}777'.format(mode[0])
+
+
+@pytest.fixture(scope='module')
+def mode_failures(request, tmpdir_factory):
+    '''
+    Run every (mode, umask) pair as single mkdir invocation creating all
+    OPERANDS, failures grouped by check
+    '''
+    root = tmpdir_factory.mktemp('mode_matrix')
+    pairs = mode_umask_pairs(request.config)
+    invocations = {}
+    for index, (mode, umask) in enumerate(pairs):
+        invocations[(mode, umask)] = mkdir_async.Invocation(
+            ['-m', mode] + OPERANDS, cwd=str(root.mkdir(str(index))), umask=umask)
+
+    parent_setgid = bool(os.stat(str(root)).st_mode & stat.S_ISGID)
+    results = mkdir_async.run_all(invocations)
+
+    failures = {}
+    for index, (mode, umask) in enumerate(pairs):
+        result = results[(mode, umask)]
+        problems = failures.setdefault(_check_key(mode), [])
+        description = "'-m {}' with umask {:03o}".format(mode, umask)
+
+        if result.timed_out or result.exit_code or result.stderr:
+            problems.append("{}: {}, {!r}".format(description, result.status, result.stderr))
+            continue
+
+        # Single scandir and stat pass over the invocation's directory
+        expected = mkdir_modes.expected_mode(mode, umask, parent_setgid)
+        verified = mkdir_verify.verify_tree(root.join(str(index)), OPERANDS, mode=expected)
+        if not verified.ok:
+            problems.append("{}: {}".format(description, verified.describe(limit=1)))
+
+    return failures
+
+
+class TestModeMatrix:
+    """
+    Class for grouping tests of '-m/--mode' option under various umasks.
+    """
+
+    @pytest.mark.parametrize('block', OCTAL_BLOCKS)
+    def test_option_mode_octal(self, mode_failures, block):
+        '''Option '-m/--mode': octal modes {block} under various umasks'''
+        # Expected outcome: all directories are created with exactly the
+        # given permission bits, umask is not applied
+
+        problems = mode_failures[('octal', block)]
+
+        assert not problems, "{} invocations failed: {}".format(
+            len(problems), "; ".join(problems[:FAILURE_SAMPLE]))
+
+    @pytest.mark.parametrize('mode', mkdir_modes.SYMBOLIC_MODES)
+    def test_option_mode_symbolic(self, mode_failures, mode):
+        '''Option '-m/--mode': mode '{mode}' under various umasks'''
+        # Expected outcome: all directories are created with permission bits
+        # of mode applied to 'a=rwx', umask limits only changes without
+        # 'ugoa' part
+
+        problems = mode_failures[('symbolic', mode)]
+
+        assert not problems, "{} invocations failed: {}".format(
+            len(problems), "; ".join(problems[:FAILURE_SAMPLE]))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import mkdir_async
+import mkdir_stress
+import mkdir_verify
+import pytest
+
+
+@pytest.mark.benchmark
+class TestBenchContention:
+    """
+    Class for grouping concurrent directory creation benchmarks.
+    """
+
+    # Concurrency levels, '--concurrency' value is added when not listed
+    CONCURRENCY_LEVELS = (1, 2, 4, 8, 16, 32, 64)
+
+    INVOCATION_COUNT = 500
+
+    # Shared tree of 4^4 leaves, every invocation creates 8 of them
+    FANOUT = 4
+    DEPTH = 4
+    OPERANDS = 8
+
+    def test_bench_parents_contention(self, workdir, bench_table):
+        '''Benchmark: concurrent '-p/--parents' creation of overlapping trees'''
+        # Expected outcome: every invocation exits with 0 and the whole tree is
+        # created at every concurrency level, throughput and tail latency
+        # show how contention on shared ancestors scales
+
+        table = bench_table("Concurrent 'mkdir -p' on overlapping trees ({} invocations, {} operands)".format(
+            TestBenchContention.INVOCATION_COUNT, TestBenchContention.OPERANDS),
+            ("pool", "concurrency", "time [s]", "calls/s", "p50 [ms]", "p99 [ms]", "max [ms]"))
+
+        path_sets, leaves = mkdir_stress.overlapping_path_sets(
+            TestBenchContention.FANOUT, TestBenchContention.DEPTH,
+            TestBenchContention.INVOCATION_COUNT, TestBenchContention.OPERANDS)
+        levels = sorted(set(TestBenchContention.CONCURRENCY_LEVELS) | {mkdir_async.concurrency_limit})
+
+        for pool in mkdir_stress.POOLS:
+            for concurrency in levels:
+                path_root = workdir.join('contention_{}_{}'.format(pool, concurrency))
+                path_root.mkdir()
+
+                stress = mkdir_stress.run_stress(path_root, path_sets, concurrency, pool)
+                table.add_row(pool, concurrency, stress.wall, int(stress.throughput),
+                              1000 * stress.latency(0.5), 1000 * stress.latency(0.99),
+                              1000 * stress.latency(1.0))
+
+                failed = stress.failed
+                assert not failed, \
+                    "{} of {} invocations failed at concurrency {}, first: {}, {}".format(
+                        len(failed), len(stress.results), concurrency, failed[0].status,
+                        failed[0].stderr.decode(errors='replace').strip())
+
+                verify = mkdir_verify.verify_tree(path_root, leaves)
+                assert verify.ok, "Incomplete tree at concurrency {}: {}".format(
+                    concurrency, verify.describe())
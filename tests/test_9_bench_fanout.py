@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+import shutil
+import time
+
+import mkdir_runner
+import mkdir_verify
+import pytest
+
+
+@pytest.mark.benchmark
+class TestBenchFanout:
+    """
+    Class for grouping large-fanout sibling directory creation benchmarks.
+    """
+
+    # ext4 limit is 64000 items in a directory (without 'dir_nlink' feature)
+    DIR_COUNTS = (1000, 10000, 32000, 64000)
+
+    # Max operands per mkdir invocation, None uses as many as ARG_MAX allows
+    CHUNK_SIZES = (100, 1000, None)
+
+    LINK_LIMIT_ERROR = 'Too many links'
+
+    def test_bench_sibling_fanout(self, workdir, bench_table):
+        '''Benchmark: large-fanout sibling directory creation'''
+        # Expected outcome: all directories are created unless file system
+        # link count limit is hit, in which case the limit is recorded
+
+        table = bench_table("Sibling directory creation (ARG_MAX budget {} bytes)".format(
+            mkdir_runner.arg_max_budget()),
+            ("dirs", "chunk", "invocations", "time [s]", "dirs/s", "created", "link limit"))
+
+        for dir_count in TestBenchFanout.DIR_COUNTS:
+            names = ['testdir{}'.format(dir_id) for dir_id in range(dir_count)]
+
+            for chunk_size in TestBenchFanout.CHUNK_SIZES:
+                path_parent = workdir.join('fanout{}_{}'.format(dir_count, chunk_size or 'max'))
+                path_parent.mkdir()
+
+                chunks = list(mkdir_runner.split_args(
+                    names, (mkdir_runner.mkdir._path,), max_count=chunk_size))
+                link_limit = None
+                link_error = TestBenchFanout.LINK_LIMIT_ERROR.encode()
+
+                start = time.perf_counter()
+                for chunk in chunks:
+                    result = mkdir_runner.mkdir(*chunk, _cwd=path_parent, _ok_code=range(256))
+                    if link_limit is None and link_error in result.stderr:
+                        link_limit = True
+                elapsed = time.perf_counter() - start
+
+                verify = mkdir_verify.verify_tree(path_parent, names)
+                created = dir_count - len(verify.missing)
+                if link_limit:
+                    # Subdirectory count at which file system refused new links
+                    link_limit = created
+
+                table.add_row(dir_count, chunk_size or "ARG_MAX",
+                              len(chunks), elapsed, int(dir_count / elapsed), created,
+                              link_limit if link_limit is not None else "not reached")
+
+                shutil.rmtree(str(path_parent))
+
+                assert link_limit is not None or verify.ok, \
+                    "Failed to create directories: {}".format(verify.describe())
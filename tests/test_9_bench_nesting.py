@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import math
+import os
+import time
+
+import mkdir_runner
+import mkdir_verify
+import pytest
+
+
+@pytest.mark.benchmark
+class TestBenchNesting:
+    """
+    Class for grouping deep directory nesting benchmarks.
+    """
+
+    PATH_MAX = 4096
+
+    # Nesting depths in levels, 'testdir/' takes 8 bytes per level
+    DEPTHS = (10, 100, 500, 1000, 2000, 4000, 8000)
+
+    # Levels created by single mkdir invocation in stepped mode, relative
+    # path of one segment stays below PATH_MAX
+    SEGMENT_DEPTH = 400
+
+    NAME = 'testdir'
+
+    @staticmethod
+    def create_single(path_case, depth: int):
+        # Whole relative path passed to single 'mkdir -p' invocation
+        mkdir_runner.mkdir('-p', '/'.join([TestBenchNesting.NAME] * depth), _cwd=path_case)
+
+    @staticmethod
+    def create_stepped(path_case, depth: int):
+        # One 'mkdir -p' invocation per segment, working directory of every
+        # invocation is end of previous segment opened relative to its parent
+        cwd_fd = os.open(str(path_case), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for start in range(0, depth, TestBenchNesting.SEGMENT_DEPTH):
+                segment = '/'.join([TestBenchNesting.NAME] * min(
+                    TestBenchNesting.SEGMENT_DEPTH, depth - start))
+                mkdir_runner.mkdir('-p', segment, _cwd=cwd_fd)
+                next_fd = os.open(segment, os.O_RDONLY | os.O_DIRECTORY, dir_fd=cwd_fd)
+                os.close(cwd_fd)
+                cwd_fd = next_fd
+        finally:
+            os.close(cwd_fd)
+
+    def test_bench_parents_nesting(self, workdir, bench_table):
+        '''Benchmark: '-p/--parents' nested directory creation by depth'''
+        # Expected outcome: nested trees of all depths are created, time per
+        # level shows whether cost grows linearly (exponent ~1) or
+        # quadratically (exponent ~2) with depth
+
+        table = bench_table("Nested directory creation using 'mkdir -p' ({} levels per step)".format(
+            TestBenchNesting.SEGMENT_DEPTH),
+            ("mode", "depth", "path bytes", "past PATH_MAX", "invocations",
+             "time [s]", "per level [us]", "exponent"))
+
+        modes = (
+            ("single", TestBenchNesting.create_single),
+            ("stepped", TestBenchNesting.create_stepped),
+        )
+
+        for mode, create in modes:
+            previous = None
+
+            for depth in TestBenchNesting.DEPTHS:
+                nested_name = '/'.join([TestBenchNesting.NAME] * depth)
+                path_case = workdir.join('nesting_{}_{}'.format(mode, depth))
+                path_case.mkdir()
+
+                start = time.perf_counter()
+                create(path_case, depth)
+                elapsed = time.perf_counter() - start
+
+                # Absolute paths are too long, tree is verified relative to descriptors
+                verify = mkdir_verify.verify_tree(path_case, [nested_name])
+                mkdir_verify.remove_tree(path_case)
+
+                assert verify.ok, "Failed to create {} levels deep directory tree: {}".format(
+                    depth, verify.describe())
+
+                # Local growth exponent of total time between consecutive depths
+                exponent = "-"
+                if previous is not None:
+                    exponent = math.log(elapsed / previous[1]) / math.log(depth / previous[0])
+                previous = (depth, elapsed)
+
+                invocations = 1 if mode == "single" else \
+                    math.ceil(depth / TestBenchNesting.SEGMENT_DEPTH)
+                table.add_row(mode, depth, len(nested_name),
+                              "yes" if len(nested_name) >= TestBenchNesting.PATH_MAX else "no",
+                              invocations, elapsed, 1e6 * elapsed / depth, exponent)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+import time
+
+import mkdir_runner
+import pytest
+
+
+@pytest.mark.benchmark
+class TestBenchRunner:
+    """
+    Class for grouping process runner benchmarks.
+    """
+
+    INVOCATION_COUNT = 200
+
+    def test_bench_runner_backends(self, workdir, bench_table):
+        '''Benchmark: per invocation cost of process runner backends'''
+        # Every backend runs 'mkdir -p' on already existing directory, so the
+        # measured time is dominated by process spawn and runner overhead
+
+        table = bench_table("Process runner backends ({} invocations of 'mkdir -p')".format(
+            TestBenchRunner.INVOCATION_COUNT), ("backend", "total [s]", "per call [ms]", "calls/s"))
+        argv = [mkdir_runner.mkdir._path, '-p', str(workdir)]
+
+        for name, backend_class in sorted(mkdir_runner.BACKENDS.items()):
+            backend = backend_class()
+            try:
+                start = time.perf_counter()
+                for _ in range(TestBenchRunner.INVOCATION_COUNT):
+                    result = backend.run(argv)
+                    assert result.exit_code == 0, "Backend '{}' returned exit code {}".format(
+                        name, result.exit_code)
+                total = time.perf_counter() - start
+            finally:
+                backend.close()
+
+            table.add_row(name, total, 1000 * total / TestBenchRunner.INVOCATION_COUNT,
+                          int(TestBenchRunner.INVOCATION_COUNT / total))